@@ -0,0 +1 @@
+"""Performance benchmarks for pyhstr's hot paths"""
@@ -0,0 +1,52 @@
+"""
+Synthetic histories for the benchmarks, shaped like real ones: Zipf-distributed
+repetition, so a few commands are typed all the time and most once or twice,
+and a share of long one-liners chaining several statements.
+"""
+
+import random
+from typing import List
+
+WORDS = ["print", "sum", "x", "range", "len", "import", "os", "sys", "data"]
+
+# share of the commands that are long one-liners
+LONG_SHARE = 0.1
+
+# how many times fewer unique commands there are than entries
+REPETITION = 5
+
+
+def make_statement(rng: random.Random, idx: int, position: int) -> str:
+    return f"{rng.choice(WORDS)}_{rng.choice(WORDS)}({idx % 97}, {position})"
+
+
+def make_command(rng: random.Random, idx: int, long_share: float) -> str:
+    if rng.random() < long_share:
+        return "; ".join(
+            make_statement(rng, idx, position)
+            for position in range(rng.randint(5, 15))
+        )
+    # the random number keeps the short commands apart
+    return f"{make_statement(rng, idx, 0)} + {rng.random()}"
+
+
+def make_history(size: int, long_share: float = LONG_SHARE) -> List[str]:
+    """
+    Returns `size` entries, the same ones for the same size.
+    """
+    rng = random.Random(size)
+    pool = [
+        make_command(rng, idx, long_share)
+        for idx in range(max(1, size // REPETITION))
+    ]
+    weights = [1 / rank for rank in range(1, len(pool) + 1)]
+    return rng.choices(pool, weights=weights, k=size)
+
+
+def make_unique_history(size: int, long_share: float = LONG_SHARE) -> List[str]:
+    """
+    Returns `size` entries without any repetition, e.g. for a page of results
+    that are all different.
+    """
+    rng = random.Random(size)
+    return [make_command(rng, idx, long_share) for idx in range(size)]
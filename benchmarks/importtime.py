@@ -0,0 +1,63 @@
+"""
+Measures `import pyhstr` with `python -X importtime` and fails when it
+exceeds the budget, or when it pulls in modules that are supposed to be
+imported only on the first hh.
+
+Run with: python -m benchmarks.importtime
+"""
+
+import subprocess
+import sys
+from typing import Dict
+
+# cumulative import time of the pyhstr package, in microseconds
+BUDGET_US = 40_000
+REPEATS = 5
+
+DEFERRED = [
+    "IPython",
+    "bpython",
+    "pyhstr.__main__",
+    "pyhstr.application",
+    "pyhstr.user_interface",
+]
+
+
+def measure() -> Dict[str, int]:
+    """
+    Returns the cumulative import time of every module imported
+    by `import pyhstr` in a fresh interpreter.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pyhstr"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:") :].split("|")
+        cumulative[module.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def main() -> int:
+    best = min(measure()["pyhstr"] for _ in range(REPEATS))
+    print(f"import pyhstr: {best / 1000:.2f} ms (budget {BUDGET_US / 1000:.2f} ms)")
+
+    failed = False
+    imported = measure()
+    for module in DEFERRED:
+        if module in imported:
+            print(f"FAIL: {module} is imported eagerly")
+            failed = True
+    if best > BUDGET_US:
+        print("FAIL: import time over budget")
+        failed = True
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Measures what injecting a selected command costs with each output backend.
+TIOCSTI is measured against a pseudo-terminal standing in for stdin.
+
+Run with: python -m benchmarks.output
+"""
+
+import os
+import sys
+import time
+
+from pyhstr.output import Output, ReadlineOutput
+
+from benchmarks.terminal import pty_stdin
+
+SIZES = [80, 1024, 8192]
+REPEATS = 5
+
+
+def time_inject(output: Output, command: str) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        output.inject(command)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    with pty_stdin() as stdin:
+        for size in SIZES:
+            command = "x" * size
+            try:
+                tiocsti = f"{time_inject(Output(), command) * 1e6:10.1f} us"
+                os.read(stdin, size * REPEATS)
+            except OSError as error:
+                tiocsti = f"unavailable ({error.strerror})"
+            readline_ = time_inject(ReadlineOutput(), command)
+            print(
+                f"{size:>5} bytes: TIOCSTI {tiocsti}, "
+                f"readline {readline_ * 1e6:10.1f} us"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Times utilities.sort over growing synthetic histories and checks that
+the running time grows linearly with the number of entries.
+
+Run with: python -m benchmarks.ranking
+"""
+
+import math
+import sys
+import time
+from typing import List
+
+from pyhstr.utilities import sort
+
+from benchmarks.generate import make_history
+
+SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 3
+
+# Growth exponent k in time ~ size ** k, fitted between the smallest and
+# the largest size. The old implementation was quadratic (k ~ 2), the
+# allowance above 1 covers sorting the unique commands and cache effects.
+MAX_EXPONENT = 1.3
+
+
+def time_sort(history: List[str]) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        sort(history)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    timings = []
+    for size in SIZES:
+        elapsed = time_sort(make_history(size))
+        timings.append(elapsed)
+        print(
+            f"{size:>9} entries: {elapsed * 1000:10.2f} ms "
+            f"({elapsed / size * 1e9:.0f} ns/entry)"
+        )
+
+    exponent = math.log(timings[-1] / timings[0]) / math.log(SIZES[-1] / SIZES[0])
+    print(f"growth exponent: {exponent:.2f}")
+    if exponent > MAX_EXPONENT:
+        print(f"FAIL: ranking does not scale linearly (limit {MAX_EXPONENT})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Counts the curses calls made per frame by UserInterface.populate_screen
+for a page of long one-liners with a short search string.
+
+Run with: python -m benchmarks.render
+"""
+
+import sys
+from typing import Callable
+
+from pyhstr.application import App
+from pyhstr.user_interface import Direction
+
+from benchmarks.generate import make_unique_history
+from benchmarks.screen import make_app
+
+
+def count(app: App, action: Callable[[], None]) -> int:
+    app.stdscr.calls.clear()
+    action()
+    return sum(app.stdscr.calls.values())
+
+
+def main() -> int:
+    with make_app(make_unique_history(1000, long_share=1)) as app:
+        report(app)
+    return 0
+
+
+def report(app: App) -> None:
+    app.user_interface.init_color_pairs()
+    page = app.user_interface.page
+
+    def type_query() -> None:
+        for char in "x_":
+            app.search_string += char
+            app.search()
+
+    frames = [
+        ("first frame", app.user_interface.populate_screen),
+        ("type 2 characters", type_query),
+        ("move selection down", lambda: page.move_selected(Direction.NEXT)),
+        ("redraw selection", app.user_interface.populate_screen),
+        ("next page", lambda: page.turn(Direction.NEXT)),
+        ("redraw page", app.user_interface.populate_screen),
+    ]
+    for name, action in frames:
+        print(f"{name:>20}: {count(app, action):6} curses calls")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Replays key sequences through __main__.main, as typed, against a synthetic
+history on a counting screen, and reports the latency from each key to the
+frame it leads to, per kind of action, with the curses calls it took.
+Fails when any key, or any step taken in between keys, like a debounced
+search, takes longer than the frame budget.
+
+Like for a real hh, main gets its App from resume(), which loads and indexes
+the history in the background while keys come in. With --warm, the keys go
+to a second hh instead, on the App of a first one that finished loading.
+
+The keys are scripted below, or recorded from a real session:
+
+Run with: python -m benchmarks.replay [--warm]
+or: python -m benchmarks.replay --record keys.json (then use pyhstr)
+and: python -m benchmarks.replay --script keys.json
+"""
+
+import argparse
+import curses
+import json
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from pyhstr import __main__, application
+from pyhstr.tracing import percentile
+from pyhstr.__main__ import (
+    CTRL_E,
+    CTRL_F,
+    CTRL_SLASH,
+    CTRL_T,
+    DEL,
+    ESC,
+)
+
+from benchmarks.generate import make_history
+from benchmarks.screen import CountingCurses, CountingScreen, fake_shell
+
+SIZE = 100_000
+LINES = 40
+COLS = 120
+
+# the longest a key or a step in between keys may take, in milliseconds
+BUDGET_MS = 16
+
+Key = Union[int, str]
+
+# keys as returned by get_wch, each with the milliseconds since the previous one
+Script = List[Tuple[Key, float]]
+
+
+def type_keys(text: str, gap: float) -> Script:
+    return [(char, gap) for char in text]
+
+
+DEFAULT_SCRIPT: Script = [
+    *type_keys("print(", 80),
+    (curses.KEY_BACKSPACE, 150),
+    (curses.KEY_BACKSPACE, 120),
+    *type_keys("t_", 80),
+    *[(curses.KEY_DOWN, 60)] * 5,
+    *[(curses.KEY_NPAGE, 150)] * 3,
+    (curses.KEY_PPAGE, 150),
+    (CTRL_F, 300),
+    (CTRL_F, 300),
+    (DEL, 300),
+    ("y", 400),
+    *[(CTRL_SLASH, 300)] * 4,
+    *[(CTRL_E, 300)] * 3,
+    (CTRL_T, 300),
+    *[(curses.KEY_BACKSPACE, 100)] * 5,
+    (ESC, 300),
+]
+
+ACTIONS = {
+    curses.KEY_BACKSPACE: "backspace",
+    CTRL_SLASH: "view toggle",
+    CTRL_F: "favorite",
+    DEL: "delete",
+    CTRL_E: "mode toggle",
+    CTRL_T: "case toggle",
+    ESC: "exit",
+    curses.KEY_UP: "selection",
+    curses.KEY_DOWN: "selection",
+    curses.KEY_PPAGE: "paging",
+    curses.KEY_NPAGE: "paging",
+}
+
+# what main does when no key came in time: searching, scanning, polling
+IDLE = "idle"
+
+
+def get_action(key: Key) -> str:
+    if key in ACTIONS:
+        return ACTIONS[key]
+    return "typing" if isinstance(key, str) else "other"
+
+
+class Cycle(NamedTuple):
+    action: str
+    elapsed: float
+    calls: int
+
+
+class ScriptedScreen(CountingScreen):
+    """
+    A counting screen whose keys come from a script, each once the time
+    since the previous one has passed. While main waits for a key with
+    a timeout, the screen waits as long as the timeout, or until the key
+    is due, whichever comes first. Waiting without a timeout skips ahead.
+
+    A cycle starts when get_wch returns, or gives up on a key, and ends
+    with the next call to get_wch, which main only makes once it drew
+    what the key or the step led to.
+    """
+
+    def __init__(self, lines: int, cols: int, script: Script):
+        super().__init__(lines, cols)
+        self.script: Deque[Tuple[Key, float]] = deque(script)
+        self.delay = -1
+        self.last_key = time.perf_counter()
+        self.cycles: List[Cycle] = []
+        self.current: Optional[Tuple[str, float, int]] = None
+
+    def timeout(self, delay: int) -> None:
+        self.calls["timeout"] += 1
+        self.delay = delay
+
+    def get_wch(self) -> Key:
+        self.end_cycle()
+        _, gap = self.script[0] if self.script else (ESC, 0.0)
+        due = self.last_key + gap / 1000
+        if self.delay >= 0 and time.perf_counter() < due:
+            time.sleep(min(self.delay / 1000, due - time.perf_counter()))
+            if time.perf_counter() < due:
+                self.start_cycle(IDLE)
+                raise curses.error("no input")
+        return self.next_key()
+
+    def getch(self) -> int:
+        # an answer to a prompt, within the cycle of the key that prompted
+        key = self.next_key(start=False)
+        return ord(key) if isinstance(key, str) else key
+
+    def next_key(self, start: bool = True) -> Key:
+        key = self.script.popleft()[0] if self.script else ESC
+        self.last_key = time.perf_counter()
+        if start:
+            self.start_cycle(get_action(key))
+        return key
+
+    def start_cycle(self, action: str) -> None:
+        self.current = (action, time.perf_counter(), sum(self.calls.values()))
+
+    def end_cycle(self) -> None:
+        if self.current is None:
+            return
+        action, start, calls = self.current
+        self.cycles.append(
+            Cycle(action, time.perf_counter() - start, sum(self.calls.values()) - calls)
+        )
+        self.current = None
+
+
+class RecordingScreen:
+    """
+    Wraps a real curses screen, noting down every key read from it,
+    with the milliseconds since the previous one.
+    """
+
+    def __init__(self, stdscr: Any):
+        self.stdscr = stdscr
+        self.script: Script = []
+        self.last_key = time.perf_counter()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stdscr, name)
+
+    def get_wch(self) -> Key:
+        return self.record(self.stdscr.get_wch())
+
+    def getch(self) -> int:
+        key = self.stdscr.getch()
+        if key != -1:
+            self.record(chr(key))
+        return key
+
+    def record(self, key: Key) -> Key:
+        now = time.perf_counter()
+        self.script.append((key, round((now - self.last_key) * 1000, 1)))
+        self.last_key = now
+        return key
+
+
+def record(path: Path) -> None:
+    def run(stdscr: Any) -> None:
+        screen = RecordingScreen(stdscr)
+        try:
+            __main__.main(screen)
+        finally:
+            path.write_text(json.dumps(screen.script) + "\n")
+
+    curses.wrapper(run)
+
+
+def replay(script: Script, size: int, warm: bool = False) -> List[Cycle]:
+    screen = ScriptedScreen(LINES, COLS, script)
+    main_curses = __main__.curses
+    with fake_shell(make_history(size), screen=screen):
+        application.SESSION = None
+        __main__.curses = CountingCurses(screen)  # type: ignore
+        try:
+            if warm:
+                # a first hh, left right away, whose App resume() then reopens
+                __main__.main(ScriptedScreen(LINES, COLS, []))
+                assert application.SESSION is not None
+                application.SESSION.wait_until_loaded()
+            __main__.main(screen)
+        finally:
+            __main__.curses = main_curses
+            app, application.SESSION = application.SESSION, None
+            if app is not None and app.loader is not None:
+                # done with the history before its files are
+                app.loader.join()
+    screen.end_cycle()
+    return screen.cycles
+
+
+def summarize(cycles: List[Cycle]) -> Dict[str, Dict[str, float]]:
+    by_action: Dict[str, List[Cycle]] = {}
+    for cycle in cycles:
+        by_action.setdefault(cycle.action, []).append(cycle)
+    summary = {}
+    for action, actions in by_action.items():
+        elapsed = sorted(cycle.elapsed * 1000 for cycle in actions)
+        summary[action] = {
+            "count": len(actions),
+            "p50_ms": percentile(elapsed, 0.5),
+            "p99_ms": percentile(elapsed, 0.99),
+            "max_ms": elapsed[-1],
+            "calls": sum(cycle.calls for cycle in actions) / len(actions),
+        }
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay")
+    parser.add_argument("--record", type=Path, help="record keys to this file")
+    parser.add_argument("--script", type=Path, help="replay keys from this file")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=SIZE,
+        help="history size (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="replay in a second hh, on the loaded App of the first",
+    )
+    parser.add_argument("--output", type=Path, help="where to write the JSON")
+    args = parser.parse_args(argv)
+
+    if args.record is not None:
+        record(args.record)
+        return 0
+
+    script = DEFAULT_SCRIPT
+    if args.script is not None:
+        script = [(key, float(gap)) for key, gap in json.loads(args.script.read_text())]
+    summary = summarize(replay(script, args.size, args.warm))
+
+    print(f"{'action':>12} {'count':>6} {'p50':>9} {'p99':>9} {'max':>9} {'calls':>7}")
+    for action, stats in sorted(summary.items()):
+        print(
+            f"{action:>12} {stats['count']:6} {stats['p50_ms']:6.2f} ms "
+            f"{stats['p99_ms']:6.2f} ms {stats['max_ms']:6.2f} ms "
+            f"{stats['calls']:7.1f}"
+        )
+    if args.output is not None:
+        args.output.write_text(json.dumps(summary, indent=2) + "\n")
+
+    worst = max(stats["max_ms"] for stats in summary.values())
+    if worst > BUDGET_MS:
+        print(f"FAIL: worst case {worst:.2f} ms is over the {BUDGET_MS} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
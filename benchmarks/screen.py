@@ -0,0 +1,130 @@
+"""
+A fake curses screen that counts the calls made to it, so rendering can be
+measured without a terminal, and helpers for building an App on top of it.
+"""
+
+import curses
+import readline
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+
+from pyhstr import application, user_interface
+from pyhstr.application import App
+from pyhstr.utilities import Shell, write
+
+
+class CountingScreen:
+    def __init__(self, lines: int, cols: int):
+        self.lines = lines
+        self.cols = cols
+        self.calls: Counter = Counter()
+
+    def __getattr__(self, name: str) -> Any:
+        def call(*args: Any) -> None:  # pylint: disable=unused-argument
+            self.calls[name] += 1
+
+        return call
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self.lines, self.cols
+
+
+class CountingCurses:
+    """
+    Stands in for the curses module in pyhstr.user_interface. Calls that only
+    make sense on a real terminal are counted against the screen.
+    """
+
+    error = curses.error
+
+    def __init__(self, screen: CountingScreen):
+        self.screen = screen
+        self.LINES = screen.lines  # pylint: disable=invalid-name
+        self.COLS = screen.cols  # pylint: disable=invalid-name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(curses, name)
+
+    def doupdate(self) -> None:
+        self.screen.calls["doupdate"] += 1
+
+    def init_pair(self, *args: int) -> None:
+        pass
+
+    @staticmethod
+    def color_pair(idx: int) -> int:
+        return idx << 8
+
+
+@contextmanager
+def fake_shell(
+    history: List[str],
+    lines: int = 40,
+    cols: int = 120,
+    screen: Optional[CountingScreen] = None,
+) -> Iterator[CountingScreen]:
+    """
+    Sets up the standard shell with the given history, for the Apps built
+    within to draw to the CountingScreen yielded, or to `screen`.
+    Its files, and what was patched to set it up, are gone once done.
+    """
+    patched = (
+        application.SHELL,
+        {shell: dict(paths) for shell, paths in application.SHELLS.items()},
+        application.HISTORIES,
+        user_interface.curses,
+        shutil.get_terminal_size,
+    )
+    with tempfile.TemporaryDirectory(prefix="pyhstr-bench-") as tmp:
+        directory = Path(tmp)
+        # the standard shell's history is read from readline,
+        # the file is what the merged view shows
+        write(directory / "history", history)
+        readline.clear_history()
+        for command in history:
+            readline.add_history(command)
+        application.SHELL = Shell.STANDARD
+        application.SHELLS[Shell.STANDARD] = {
+            "hist": directory / "history",
+            "fav": directory / "favorites",
+            "index": None,
+        }
+        # leaves the histories of the other shells out of the merged view
+        for shell in (Shell.IPYTHON, Shell.BPYTHON):
+            application.SHELLS[shell]["hist"] = directory / shell.value
+        application.HISTORIES = directory / "histories"
+        if screen is None:
+            screen = CountingScreen(lines, cols)
+        lines, cols = screen.getmaxyx()
+        user_interface.curses = CountingCurses(screen)  # type: ignore
+        shutil.get_terminal_size = lambda *args: (cols, lines)  # type: ignore
+        try:
+            yield screen
+        finally:
+            (
+                application.SHELL,
+                shells,
+                application.HISTORIES,
+                user_interface.curses,
+                shutil.get_terminal_size,
+            ) = patched
+            application.SHELLS.update(shells)
+
+
+@contextmanager
+def make_app(
+    history: List[str],
+    lines: int = 40,
+    cols: int = 120,
+    screen: Optional[CountingScreen] = None,
+) -> Iterator[App]:
+    """
+    Builds an App for the standard shell with the given history, see fake_shell(),
+    drawing to a CountingScreen available as app.stdscr, or to `screen`.
+    """
+    with fake_shell(history, lines, cols, screen) as stdscr:
+        yield App(stdscr)
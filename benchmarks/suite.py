@@ -0,0 +1,197 @@
+"""
+Times every hot path over synthetic histories of growing size, and writes
+the timings, in seconds, as JSON. With --compare, fails when any path got
+slower than in a stored baseline by more than the threshold.
+
+Run with: python -m benchmarks.suite --output baseline.json
+and later: python -m benchmarks.suite --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from pyhstr.application import App
+from pyhstr.utilities import echo, read, remove_duplicates, sort, write
+
+from benchmarks.generate import make_history
+from benchmarks.screen import make_app
+from benchmarks.terminal import pty_stdin
+
+SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 5
+
+# how much slower than the baseline a path may get, as a fraction
+THRESHOLD = 0.25
+
+SEARCH_STRING = "print"
+ECHO_SIZE = 1024
+
+
+def report(name: str, outcome: str) -> None:
+    # on stderr, stdout is for the JSON
+    print(f"{name:>28}: {outcome}", file=sys.stderr)
+
+
+def best_of(action: Callable[[], object], repeats: int = REPEATS) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_ranking(history: List[str]) -> Dict[str, float]:
+    return {
+        "sort": best_of(lambda: sort(history)),
+        "remove_duplicates": best_of(lambda: remove_duplicates(history)),
+    }
+
+
+def time_files(history: List[str]) -> Dict[str, float]:
+    path = Path(tempfile.mkdtemp(prefix="pyhstr-bench-")) / "history"
+    timings = {"write": best_of(lambda: write(path, history))}
+    timings["read"] = best_of(lambda: read(path))
+    path.unlink()
+    path.parent.rmdir()
+    return timings
+
+
+def time_app(history: List[str]) -> Dict[str, float]:
+    with make_app(history) as app:
+        return time_searches(app)
+
+
+def time_searches(app: App) -> Dict[str, float]:
+    ui = app.user_interface
+
+    def search(everything: bool) -> None:
+        # as typed from scratch, not narrowed from the previous search
+        app.search_results.clear()
+        app.search_string = SEARCH_STRING
+        app.search()
+        if everything:
+            len(app.commands[app.view])
+
+    def redraw() -> None:
+        ui.clear()
+        ui.populate_screen()
+
+    timings = {
+        # what showing the first page of results costs
+        "search": best_of(lambda: search(False)),
+        # what scanning for every match costs
+        "search_all": best_of(lambda: search(True)),
+        "populate_screen": best_of(redraw),
+    }
+    app.search_string = ""
+    return timings
+
+
+def time_echo() -> Optional[float]:
+    """
+    Echoes a command into a pseudo-terminal standing in for stdin,
+    or returns None where TIOCSTI is not allowed.
+    """
+    command = "x" * ECHO_SIZE
+    with pty_stdin() as stdin:
+        try:
+            elapsed = best_of(lambda: echo(command))
+            os.read(stdin, ECHO_SIZE * REPEATS)
+            return elapsed
+        except OSError:
+            return None
+
+
+def run(sizes: List[int]) -> Dict[str, Optional[float]]:
+    """
+    Returns the timings keyed by path and history size, e.g. "sort/10000".
+    """
+    results: Dict[str, Optional[float]] = {}
+    for size in sizes:
+        history = make_history(size)
+        for bench in (time_ranking, time_files, time_app):
+            for name, elapsed in bench(history).items():
+                results[f"{name}/{size}"] = elapsed
+                report(f"{name}/{size}", f"{elapsed * 1000:10.2f} ms")
+    echoed = results["echo"] = time_echo()
+    report("echo", "unavailable" if echoed is None else f"{echoed * 1000:10.2f} ms")
+    return results
+
+
+def compare(
+    results: Dict[str, Optional[float]],
+    baseline: Dict[str, Optional[float]],
+    threshold: float,
+) -> List[str]:
+    """
+    Returns the paths slower than in the baseline by more than the threshold.
+    Paths missing from either, or not measured, are not compared.
+    """
+    regressions = []
+    for name, elapsed in results.items():
+        before = baseline.get(name)
+        if elapsed is None or before is None or before <= 0:
+            continue
+        change = elapsed / before - 1
+        if change > threshold:
+            regressions.append(name)
+            report(name, f"{change:+8.1%} REGRESSED")
+        else:
+            report(name, f"{change:+8.1%}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument(
+        "--sizes",
+        type=lambda sizes: [int(size) for size in sizes.split(",")],
+        default=SIZES,
+        help="comma separated history sizes (default: %(default)s)",
+    )
+    parser.add_argument("--output", type=Path, help="where to write the JSON")
+    parser.add_argument("--compare", type=Path, help="a JSON written before")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="allowed slowdown as a fraction (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes)
+    dumped = json.dumps(
+        {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output is not None:
+        args.output.write_text(dumped + "\n")
+    else:
+        print(dumped)
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(
+                f"FAIL: {', '.join(regressions)} slower by over {args.threshold:.0%}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+A pseudo-terminal standing in for stdin, for measuring injection with
+TIOCSTI without typing into the terminal the benchmarks run in.
+"""
+
+import os
+import pty
+import tty
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def pty_stdin() -> Iterator[int]:
+    """
+    Puts a pseudo-terminal in place of stdin for the duration of the block,
+    yielding the descriptor to drain what was injected into it from.
+    """
+    master, slave = pty.openpty()
+    # raw, so the injected bytes don't wait for a newline and can be drained
+    tty.setraw(slave)
+    stdin = os.dup(0)
+    os.dup2(slave, 0)
+    try:
+        yield slave
+    finally:
+        os.dup2(stdin, 0)
+        for fd in (stdin, master, slave):
+            os.close(fd)
@@ -5,14 +5,11 @@ __version__ = "0.5.2"
 import curses
 import sys
 
-try:
-    import IPython
-except ModuleNotFoundError:  # pragma: no cover
-    IPython = None
+from pyhstr.utilities import Shell, detect_shell
 
-from pyhstr.__main__ import main
-from pyhstr.application import SHELL
-from pyhstr.utilities import Shell
+# Importing pyhstr runs at every interpreter start when aliased, so anything
+# beyond picking the hook (the UI, history loading, bpython's config) is
+# imported on the first hh. detect_shell() itself never imports IPython.
 
 hh = object()
 original = sys.displayhook
@@ -20,19 +17,24 @@ original = sys.displayhook
 
 def spam(arg: object) -> None:
     if arg == hh:
+        from pyhstr.__main__ import main  # pylint: disable=import-outside-toplevel
+
         curses.wrapper(main)
     else:
         original(arg)
 
 
-if SHELL != Shell.IPYTHON:
+if detect_shell() != Shell.IPYTHON:
     sys.displayhook = spam
 else:
+    from IPython.core.magic import register_line_magic
 
-    @IPython.core.magic.register_line_magic
+    @register_line_magic
     def hh(line: str) -> None:  # pylint: disable=function-redefined,unused-argument
         """
         This line magic mirrors the behaviour of sys.displayhook
         in the regular Python shell. Use %hh to invoke.
         """
+        from pyhstr.__main__ import main  # pylint: disable=import-outside-toplevel
+
         curses.wrapper(main)
@@ -1,9 +1,8 @@
 import curses
-from typing import Any, TYPE_CHECKING
+from typing import Any, Optional, TYPE_CHECKING, Union
 
-from pyhstr.application import App, View
-from pyhstr.user_interface import Direction
-from pyhstr.utilities import echo
+from pyhstr.application import App, View, resume, suspend
+from pyhstr.user_interface import COLORS, Direction
 
 if TYPE_CHECKING:
     from _curses import _CursesWindow  # pylint: disable=no-name-in-module
@@ -26,47 +25,108 @@ TAB = "\t"
 ENTER = "\n"
 ESC = "\x1b"
 DEL = curses.KEY_DC
+INS = curses.KEY_IC
+
+# how often to check on the history being loaded, in milliseconds
+LOADING_POLL_INTERVAL = 50
+
+
+def is_typing(user_input: Union[int, str]) -> bool:
+    if user_input == curses.KEY_BACKSPACE:
+        return True
+    return isinstance(user_input, str) and user_input not in {
+        CTRL_E,
+        CTRL_F,
+        CTRL_T,
+        CTRL_SLASH,
+        TAB,
+        ENTER,
+        ESC,
+    }
+
+
+def get_selected(app: App) -> Optional[str]:
+    """
+    The selected command once the history is loaded, or None if there is none,
+    like while a search matches nothing.
+    """
+    app.wait_until_loaded()
+    app.finish_search()
+    if app.user_interface.page.get_size() == 0:
+        return None
+    return app.user_interface.page.get_selected()
 
 
 def main(stdscr: _CursesWindow) -> None:  # pylint: disable=too-many-statements
-    app = App(stdscr)
-    app.user_interface.init_color_pairs()
+    app = resume(stdscr)
+    if not any(COLORS.values()):
+        # curses keeps them for the next hh in the session, like the App
+        app.user_interface.init_color_pairs()
     app.user_interface.populate_screen()
 
     while True:
+        if app.finished_loading():
+            app.user_interface.populate_screen()
+
+        # while a search is scheduled or still scanning, poll for input
+        # and search some more whenever there is none,
+        # while the history is loading, show what has been loaded so far
+        searching = app.scheduled.is_pending()
+        scanning = app.user_interface.is_scanning()
+        loading = app.is_loading()
+        if searching:
+            app.stdscr.timeout(app.scheduled.get_delay())
+        elif scanning:
+            app.stdscr.timeout(0)
+        elif loading:
+            app.stdscr.timeout(LOADING_POLL_INTERVAL)
+        else:
+            app.stdscr.timeout(-1)
         try:
             user_input = app.stdscr.get_wch()
         except curses.error:
-            app.stdscr.clear()
-            app.user_interface.populate_screen()
+            if searching:
+                app.advance_search()
+            elif scanning:
+                app.advance_scan()
+                app.user_interface.populate_screen()
+            elif loading:
+                app.user_interface.populate_screen()
+            else:
+                app.user_interface.resize()
             continue
         except KeyboardInterrupt:
             break
 
         # user_input is Union[int, str], sometimes isinstance needed to make mypy happy
 
+        if searching and not is_typing(user_input):
+            # whatever the key does, it does to the results of what was typed
+            app.finish_search()
+
         if user_input == CTRL_E:
             app.toggle_regex_mode()
             app.user_interface.page.selected = 0
+            if app.search_string:
+                # in between keystrokes, like typing, fuzzy ranking takes a while
+                app.search_soon()
             app.user_interface.populate_screen()
 
         elif user_input == CTRL_F:
-            command = app.user_interface.page.get_selected()
-            if app.view == View.FAVORITES:
-                app.user_interface.page.retain_selection()
-            app.add_or_rm_fav(command)
-            app.stdscr.clear()
+            command = get_selected(app)
+            if command is not None:
+                if app.view == View.FAVORITES:
+                    app.user_interface.page.retain_selection()
+                app.add_or_rm_fav(command)
             app.user_interface.populate_screen()
 
-        elif user_input == TAB:
-            command = app.user_interface.page.get_selected()
-            echo(command)
-            break
-
-        elif user_input == ENTER:
-            command = app.user_interface.page.get_selected()
-            echo(command)
-            echo("\n")
+        elif user_input in {TAB, ENTER}:
+            command = get_selected(app)
+            if command is None:
+                app.user_interface.populate_screen()
+                continue
+            with app.tracer.span("echo"):
+                app.output.inject(command, run=user_input == ENTER)
             break
 
         elif user_input == CTRL_T:
@@ -76,11 +136,13 @@ def main(stdscr: _CursesWindow) -> None:  # pylint: disable=too-many-statements
         elif user_input == ESC:
             break
 
+        elif user_input == curses.KEY_RESIZE:
+            app.user_interface.resize()
+
         elif user_input == CTRL_SLASH:
             app.toggle_view()
             app.user_interface.page.selected = 0
             app.user_interface.page.value = 1
-            app.stdscr.clear()
             app.user_interface.populate_screen()
 
         elif user_input in {curses.KEY_UP, curses.KEY_DOWN}:
@@ -97,25 +159,39 @@ def main(stdscr: _CursesWindow) -> None:  # pylint: disable=too-many-statements
             app.search_string = app.search_string[:-1]
             if not app.search_string:
                 app.user_interface.page.selected = 0
-            app.commands = app.to_restore.copy()
-            app.search()
+            app.search_soon()
+            app.user_interface.populate_screen()
+
+        elif user_input == INS:
+            command = get_selected(app)
+            if command is not None:
+                app.toggle_mark(command)
+                app.user_interface.page.move_selected(Direction.NEXT)
+            app.user_interface.populate_screen()
 
         elif user_input == DEL:
-            command = app.user_interface.page.get_selected()
-            app.user_interface.prompt_for_deletion(command)
-            answer = app.stdscr.getch()
-            if answer == ord("y"):
-                app.user_interface.page.retain_selection()
-                app.delete_from_history(command)
-            app.stdscr.clear()
+            # the marked commands if any, all in one pass, or the selected one
+            commands = tuple(app.marked)
+            if not commands:
+                command = get_selected(app)
+                commands = () if command is None else (command,)
+            if commands:
+                app.user_interface.prompt_for_deletion(*commands)
+                app.stdscr.timeout(-1)
+                answer = app.stdscr.getch()
+                if answer == ord("y"):
+                    app.user_interface.page.retain_selection()
+                    app.delete_from_history(*commands)
             app.user_interface.populate_screen()
 
         elif isinstance(user_input, str):
             # not another special int character like curses.KEY_UP
             app.search_string += user_input
-            app.commands = app.to_restore.copy()
-            app.search()
+            app.search_soon()
+            app.user_interface.populate_screen()
 
     stdscr.clear()
     stdscr.refresh()
     curses.doupdate()
+    suspend(app)
+    app.tracer.flush()
@@ -1,35 +1,73 @@
-import re
-import readline
+import os
+import threading
+import time
 
+from collections import Counter
+from functools import partial
+from itertools import groupby, islice
+from operator import itemgetter
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
     Any,
+    Callable,
     Dict,
+    Iterable,
     List,
     Optional,
     Pattern,
+    Sequence,
+    Set,
+    Tuple,
 )
 
-try:
-    import IPython
-except ModuleNotFoundError:  # pragma: no cover
-    IPython = None
-
+from pyhstr import index
+from pyhstr.favorites import Favorites
+from pyhstr.fuzzy import Matcher
+from pyhstr.output import get_output
+from pyhstr.ranking import Ranking
+from pyhstr.search import (
+    MATCH_BUDGET,
+    SEARCH_DEBOUNCE,
+    Query,
+    Results,
+    ScheduledSearch,
+)
+from pyhstr.sources import (
+    ReadlineHistory,
+    Source,
+    get_readline,
+    get_sources,
+    merge,
+)
+from pyhstr.tracing import get_tracer
+from pyhstr.trigram import TrigramIndex, get_literals
 from pyhstr.user_interface import UserInterface
 from pyhstr.utilities import (
+    IPYTHON_LAST,
+    IPYTHON_LATEST,
+    IPYTHON_SESSION_SIZE,
+    IPYTHON_SINCE,
+    IPYTHON_SORTED,
+    IPYTHON_UNIQUE,
     Shell,
     View,
+    connect_ipython_db,
     detect_shell,
     get_bpython_history_path,
-    get_ipython_history,
+    get_ipython_db,
+    index_ipython_history,
+    iter_ipython_history,
+    register_decay,
     read,
-    remove_duplicates,
+    replacing,
     sort,
     write,
 )
 
 if TYPE_CHECKING:  # pragma: no cover
+    from sqlite3 import Connection
+
     from _curses import _CursesWindow  # pylint: disable=no-name-in-module
 else:
     _CursesWindow = Any
@@ -39,124 +77,735 @@ SHELL = detect_shell()
 
 SHELLS: Dict[Shell, Dict[str, Optional[Path]]] = {
     Shell.IPYTHON: {
-        "hist": None,
+        # only read directly for the merged view, see _merge()
+        "hist": Path(os.environ.get("IPYTHONDIR", "~/.ipython")).expanduser()
+        / "profile_default"
+        / "history.sqlite",
         "fav": Path("~/.config/pyhstr/ipython_favorites").expanduser(),
+        "index": None,
     },
     Shell.BPYTHON: {
-        "hist": get_bpython_history_path(),
+        # looked up by the first App, reading bpython's config is expensive
+        "hist": None,
         "fav": Path("~/.config/pyhstr/bpython_favorites").expanduser(),
+        "index": Path("~/.config/pyhstr/bpython_index").expanduser(),
     },
     Shell.STANDARD: {
+        # read from readline, see ReadlineHistory, the file is for deletions
         "hist": Path("~/.python_history").expanduser(),
         "fav": Path("~/.config/pyhstr/python_favorites").expanduser(),
+        # when each command was last run, see index.stamp()
+        "index": Path("~/.config/pyhstr/python_stamps").expanduser(),
     },
 }
 
+# more histories for the merged view, see sources.read_config()
+HISTORIES = Path("~/.config/pyhstr/histories").expanduser()
+
+# how many merged commands are added to the merged view at a time
+MERGE_BATCH_SIZE = 1000
+
 
 class App:
-    def __init__(self, stdscr: _CursesWindow):
+    def __init__(self, stdscr: _CursesWindow, background: bool = False):
         self.stdscr = stdscr
+        self.tracer = get_tracer()
         self.user_interface = UserInterface(self)
-        self.raw_history: List[str] = self.get_history()
-        self.commands: Dict[View, List[str]] = {
-            View.SORTED: sort(self.raw_history),
-            View.FAVORITES: sort(read(SHELLS[SHELL]["fav"])),
-            View.ALL: remove_duplicates(self.raw_history),
+        self.favorites = Favorites(SHELLS[SHELL]["fav"], load=False)
+        # filled in by _load(), either right here or in the background
+        self.to_restore: Dict[View, List[str]] = {
+            View.SORTED: [],
+            View.FAVORITES: [],
+            View.ALL: [],
+            # filled in by _merge(), once first shown
+            View.MERGED: [],
         }
-        self.to_restore = self.commands.copy()
+        # which history each command in the merged view was first seen in
+        self.provenance: Dict[str, str] = {}
+        self.merged = False
+        # the views as shown, i.e. filtered by the search
+        self.commands: Dict[View, Sequence[str]] = dict(self.to_restore)
+        # built once the history is loaded, see _lookup()
+        self.trigrams: Optional[TrigramIndex] = None
+        # the merged view's, built along with it, see _merge()
+        self.merged_trigrams = TrigramIndex()
+        # by view, built on the first lookup, see _get_ranks()
+        self.ranks: Dict[View, Dict[str, int]] = {}
+        # what the views were loaded from, for _refresh() to update
+        self.ranking: Optional[Ranking] = None
+        self.readline_history = ReadlineHistory()
+        # how far into IPython's history database the views go
+        self.watermark = 0
+        self.loader: Optional[threading.Thread] = None
+        # builds the trigram index once the views are loaded, see _index()
+        self.indexer: Optional[threading.Thread] = None
+        # deletes from the shell's history, see delete_from_history()
+        self.deleter: Optional[threading.Thread] = None
+        self.load_error: Optional[BaseException] = None
+        # IPython's own connection only works in this thread, see _get_ipython_db()
+        self.ipython_db: Optional["Connection"] = None
+        if SHELL == Shell.IPYTHON:
+            self.ipython_db = connect_ipython_db()
+            # without a connection of its own, the history is read right here
+            background = background and self.ipython_db is not None
+        self.background = background
         self.regex_mode: bool = False
+        self.fuzzy_mode: bool = False
+        self.matcher = Matcher()
         self.case_sensitivity: bool = False
         self.view: View = View.SORTED
         self.search_string = ""
+        self.query = Query()
+        self.output = get_output(SHELL)
+        # one (search string, matches) entry per keystroke, see _narrow()
+        self.search_results: List[Tuple[str, Results]] = []
+        self.search_key: Tuple[View, bool, bool, bool] = (
+            View.SORTED,
+            False,
+            False,
+            False,
+        )
+        # a search typed but not shown yet, see search_soon()
+        self.scheduled = ScheduledSearch()
+        # to be deleted together, in one delete_from_history(), in marking order
+        self.marked: Dict[str, None] = {}
+        # last, so the loader finds everything else set up
+        self._start_loading(self._load_and_index)
+
+    def _get_ranking(self) -> Ranking:
+        with self.tracer.span("ranking"):
+            return self._rank_history()
+
+    def _rank_history(self) -> Ranking:
+        # IPython's history is ranked in its database instead, see _load()
+        if SHELL == Shell.STANDARD:
+            # readline has no timestamps, commands count as run when last seen
+            # run again, which index.stamp() keeps track of across sessions
+            entries = self.readline_history.read()
+            now = time.time()
+            ranking = Ranking()
+            ranking.update(
+                entries,
+                now,
+                index.stamp(SHELLS[Shell.STANDARD]["index"], Counter(entries), now),
+            )
+            return ranking
+        return index.load(SHELLS[SHELL]["hist"], SHELLS[SHELL]["index"])
+
+    def _load(self) -> None:
+        """
+        Reads the favorites and the history into the views. The views are
+        only ever extended, a page at a time where the history is paged,
+        so whatever was published so far can be shown while loading.
+        """
+        if SHELL == Shell.BPYTHON and SHELLS[SHELL]["hist"] is None:
+            SHELLS[SHELL]["hist"] = get_bpython_history_path()
+        self.favorites.load()
+        self.to_restore[View.FAVORITES].extend(sort(list(self.favorites)))
+        if SHELL == Shell.IPYTHON:
+            # ranked inside SQLite, both views are read in turns
+            db = self._get_ipython_db()
+            index_ipython_history(db)
+            register_decay(db)
+            (self.watermark,) = db.execute(IPYTHON_LAST).fetchone()
+            # scored as of the start of the latest session, see _refresh_ipython()
+            (latest,) = db.execute(IPYTHON_LATEST).fetchone()
+            self.ranking = ranking = Ranking()
+            ranking.epoch = None if latest is None else float(latest)
+            loading = [
+                (View.SORTED, iter_ipython_history(db, IPYTHON_SORTED)),
+                (View.ALL, iter_ipython_history(db, IPYTHON_UNIQUE)),
+            ]
+            while loading:
+                for view, pages in loading.copy():
+                    page = next(pages, None)
+                    if page is None:
+                        loading.remove((view, pages))
+                        continue
+                    if view == View.SORTED:
+                        ranking.extend(page)
+                    self.to_restore[view].extend(row[0] for row in page)
+        else:
+            self.ranking = ranking = self._get_ranking()
+            self.to_restore[View.SORTED].extend(ranking.sorted())
+            self.to_restore[View.ALL].extend(ranking.unique())
+
+    def reopen(self, stdscr: _CursesWindow) -> None:
+        """
+        Readies the App of the previous hh for the next one: a new screen,
+        no search, and the views brought up to date, see _refresh().
+        Favorites and everything cached for searching are kept as they are.
+        """
+        self.stdscr = stdscr
+        self.user_interface = UserInterface(self)
+        self.regex_mode = False
+        self.fuzzy_mode = False
+        self.case_sensitivity = False
+        self.view = View.SORTED
+        self.search_string = ""
+        self.search_results.clear()
+        self.scheduled.cancel()
+        self.marked.clear()
+        self.commands = dict(self.to_restore)
+        # after anything still loading, which may have read the history
+        # before the commands run since, or not at all, like _merge()
+        self._start_loading(self._refresh)
+
+    def _refresh(self) -> None:
+        """
+        Adds the commands run since the views were loaded, reading only those.
+        For the standard shell, they are the entries readline got since,
+        for bpython the lines appended to the history file, see index.load().
+        For IPython, the rows added to the history database since.
+        Once merged, the merged view gets them too.
+        """
+        self._wait_until_indexed()
+        with self.tracer.span("refresh"):
+            self._refresh_history()
 
-    def get_history(self) -> List[str]:  # pylint: disable=no-self-use
+    def _refresh_history(self) -> None:
         if SHELL == Shell.IPYTHON:
-            return get_ipython_history()
-        return read(SHELLS[SHELL]["hist"])
+            self._refresh_ipython()
+            return
+        assert self.ranking is not None
+        ranking = self.ranking
+        if SHELL == Shell.STANDARD:
+            entries = self.readline_history.read()
+            now = time.time()
+            ranking.update(entries, now)
+            if entries:
+                index.stamp(SHELLS[Shell.STANDARD]["index"], ranking.counts, now)
+        else:
+            ranking = self._get_ranking()
+
+        if ranking is not self.ranking:
+            # the history was rewritten, and ranked from scratch
+            self.ranking = ranking
+            self.to_restore[View.SORTED][:] = ranking.sorted()
+            self.to_restore[View.ALL][:] = ranking.unique()
+            self._index()
+            self._unmerge()
+            return
+        self.to_restore[View.SORTED][:] = ranking.sorted()
+        # the ranking has the same commands as the view, new ones come last
+        new = list(islice(ranking.counts, len(self.to_restore[View.ALL]), None))
+        self.to_restore[View.ALL].extend(new)
+        if self.trigrams is not None:
+            self.trigrams.add(new)
+        self._merge_new(new)
+
+    def _refresh_ipython(self) -> None:
+        assert self.ranking is not None
+        ranking = self.ranking
+        added = (
+            self._get_ipython_db()
+            .execute(
+                IPYTHON_SINCE, (self.watermark // IPYTHON_SESSION_SIZE, self.watermark)
+            )
+            .fetchall()
+        )
+        if not added:
+            return
+        self.watermark = added[-1][2]
+        new = [
+            command
+            for command in dict.fromkeys(source for source, _, _ in added)
+            if command not in ranking.counts
+        ]
+        # like in IPYTHON_SORTED, a run scores as of when its session started
+        for start, runs in groupby(added, key=itemgetter(1)):
+            ranking.update(
+                [source for source, _, _ in runs],
+                None if start is None else float(start),
+            )
+        self.to_restore[View.SORTED][:] = ranking.sorted()
+        self.to_restore[View.ALL].extend(new)
+        if self.trigrams is not None:
+            self.trigrams.add(new)
+        self._merge_new(new)
+
+    def _get_ipython_db(self) -> "Connection":
+        """
+        The connection the history is loaded from, which, unlike IPython's own,
+        works in the threads loading it too, see connect_ipython_db().
+        """
+        if self.ipython_db is None:
+            return get_ipython_db()
+        return self.ipython_db
+
+    def _merge_new(self, commands: List[str]) -> None:
+        # run last, so they go last, as coming from this shell
+        if not self.merged:
+            return
+        new = [command for command in commands if command not in self.provenance]
+        for command in new:
+            self.provenance[command] = SHELL.value
+        self.to_restore[View.MERGED].extend(new)
+        self.merged_trigrams.add(new)
+
+    def _unmerge(self) -> None:
+        # merged again when next shown, see toggle_view()
+        self.merged = False
+        self.to_restore[View.MERGED].clear()
+        self.provenance.clear()
+        self.merged_trigrams = TrigramIndex()
+
+    def _index(self) -> None:
+        """
+        Builds the trigram index over every command in the history, which
+        are all in the ALL view, once. Until it is done, searches scan,
+        and anything changing that view waits for it, see _wait_until_indexed().
+        """
+        with self.tracer.span("index"):
+            self.trigrams = TrigramIndex(self.to_restore[View.ALL])
+
+    def _merge(self) -> None:
+        """
+        Fills the merged view with the histories of all the shells and the
+        ones listed in HISTORIES, a batch at a time, like _load(), then with
+        what only this shell has loaded, e.g. the commands of this session,
+        which are not in its history file yet.
+        """
+        if SHELLS[Shell.BPYTHON]["hist"] is None:
+            SHELLS[Shell.BPYTHON]["hist"] = get_bpython_history_path()
+        shells = [
+            Source(shell.value, path)
+            for shell, path in ((shell, SHELLS[shell]["hist"]) for shell in Shell)
+            if path is not None
+        ]
+        merged = self.to_restore[View.MERGED]
+        batch = []
+        for command, tag in merge(get_sources(shells, HISTORIES)):
+            self.provenance[command] = tag
+            batch.append(command)
+            if len(batch) >= MERGE_BATCH_SIZE:
+                merged.extend(batch)
+                self.merged_trigrams.add(batch)
+                batch = []
+        merged.extend(batch)
+        self.merged_trigrams.add(batch)
+        self._merge_new(self.to_restore[View.ALL])
+
+    def _start_loading(self, load: Callable[[], None]) -> None:
+        """
+        Runs `load` in the background, once the loader running, if any, is done.
+        """
+        self.ranks.clear()
+        self.matcher.reset()
+        if self.background:
+            self.loader = threading.Thread(
+                target=self._load_in_background, args=(load, self.loader), daemon=True
+            )
+            self.loader.start()
+        else:
+            load()
+
+    def _load_and_index(self) -> None:
+        with self.tracer.span("load"):
+            self._load()
+        if self.background:
+            # without holding up anything waiting for the views
+            self.indexer = threading.Thread(target=self._index, daemon=True)
+            self.indexer.start()
+        else:
+            self._index()
+
+    def _load_in_background(
+        self, load: Callable[[], None], previous: Optional[threading.Thread]
+    ) -> None:
+        if previous is not None:
+            previous.join()
+        if self.load_error is not None:
+            # the views are incomplete, there is nothing to add to
+            return
+        try:
+            load()
+        except BaseException as error:  # pylint: disable=broad-except
+            # raised in the main thread instead, see finished_loading()
+            self.load_error = error
+
+    def is_loading(self) -> bool:
+        return self.loader is not None and self.loader.is_alive()
+
+    def finished_loading(self) -> bool:
+        """
+        Tells whether the background loading finished since this was last asked.
+        """
+        if self.loader is None or self.loader.is_alive():
+            return False
+        self.wait_until_loaded()
+        return True
+
+    def wait_until_loaded(self) -> None:
+        """
+        Blocks until the views are complete, which anything that changes
+        them has to do first. A search made while loading is redone
+        over the complete views, in fuzzy mode once the input is idle,
+        see advance_search().
+        """
+        if self.loader is None:
+            return
+        self.loader.join()
+        self.loader = None
+        if self.load_error is not None:
+            error, self.load_error = self.load_error, None
+            raise error
+        self.search_results.clear()
+        if self.search_string and self.fuzzy_mode:
+            self.search_soon()
+        elif self.search_string:
+            self.search()
+
+    def _wait_until_indexed(self) -> None:
+        if self.indexer is not None:
+            self.indexer.join()
+            self.indexer = None
 
     def search(self) -> None:
+        self.scheduled.cancel()
+
+        search_regex = self.create_search_regex()
+        if search_regex is None:
+            self._show_results([])
+            self.user_interface.show_regex_error()
+            return
+
+        matches: Sequence[str]
+        with self.tracer.span("search"):
+            if self.fuzzy_mode and self.search_string:
+                matches = self._rank(self.to_restore[self.view], search_regex)
+            else:
+                matches = self._narrow(search_regex)
+        self._show_results(matches)
+
+    def _show_results(self, matches: Sequence[str]) -> None:
         self.user_interface.page.selected = 0
         self.user_interface.page.value = 1
+        self.commands[self.view] = matches
+        self.user_interface.populate_screen()
 
-        search_regex = self.create_search_regex()
+    def search_soon(self) -> None:
+        """
+        Schedules a search for the search string as it is once typing pauses,
+        superseding any search scheduled or in progress. Until the new search
+        found a page of results, the last ones stay on screen.
 
-        if search_regex is not None:
-            self.commands[self.view] = [
-                cmd for cmd in self.commands[self.view] if search_regex.search(cmd)
-            ]
-            self.stdscr.clear()
-            self.user_interface.populate_screen()
+        The search is advanced by advance_search() whenever no key is waiting,
+        a chunk of candidates at a time, so keys never wait for a scan.
+        """
+        self.scheduled.schedule(SEARCH_DEBOUNCE)
+
+    def advance_search(self) -> None:
+        scheduled = self.scheduled
+        if not scheduled.is_pending():
+            return
+        if not scheduled.is_started():
+            if not scheduled.is_due():
+                return
+            search_regex = self.create_search_regex()
+            if search_regex is None:
+                self.search()
+                return
+            with self.tracer.span("search"):
+                if self.fuzzy_mode and self.search_string:
+                    scheduled.ranked = self.matcher.start(
+                        self.to_restore[self.view],
+                        search_regex,
+                        self.search_string,
+                        case_sensitivity=self.case_sensitivity,
+                    )
+                else:
+                    scheduled.results = self._narrow(search_regex)
+        if scheduled.ranked is not None:
+            # fuzzy searches are ranked, so nothing is shown until all are
+            with self.tracer.span("search"):
+                done = scheduled.ranked.advance()
+            if done:
+                self.finish_search()
+            return
+        assert scheduled.results is not None
+        with self.tracer.span("search"):
+            done = scheduled.results.advance()
+        if done or scheduled.results.found >= self.user_interface.layout.page_size:
+            self.finish_search()
+
+    def finish_search(self) -> None:
+        """
+        Shows the results of the scheduled search right away,
+        for keys that act on them.
+        """
+        if not self.scheduled.is_pending():
+            return
+        matches: Sequence[str]
+        if self.scheduled.ranked is not None:
+            with self.tracer.span("search"):
+                matches = self.scheduled.ranked.finish()
+        elif self.scheduled.results is not None:
+            matches = self.scheduled.results
         else:
-            self.commands[self.view] = []
-            self.stdscr.clear()
-            self.user_interface.populate_screen()
-            self.user_interface.show_regex_error()
+            self.search()
+            return
+        self.scheduled.cancel()
+        self._show_results(matches)
 
-    def create_search_regex(self) -> Optional[Pattern]:
-        try:
-            search_string = (
-                self.search_string if self.regex_mode else re.escape(self.search_string)
-            )
-            return re.compile(
-                search_string, re.IGNORECASE if not self.case_sensitivity else 0
+    def _narrow(self, search_regex: Pattern) -> Results:
+        """
+        In plain mode, the matches for a search string are a subset of
+        the matches for any of its prefixes. So instead of rescanning the
+        whole view, filter the result cached for the longest prefix, and
+        on backspace just pop back to the result cached for the shorter
+        search string. Where the trigram index finds fewer candidates than
+        the prefix matched, or the prefix is still being scanned, those are
+        filtered instead.
+        """
+        search_key = (
+            self.view,
+            self.regex_mode,
+            self.case_sensitivity,
+            self.fuzzy_mode,
+        )
+        if self.regex_mode or search_key != self.search_key:
+            self.search_results.clear()
+            self.search_key = search_key
+
+        while self.search_results and not self.search_string.startswith(
+            self.search_results[-1][0]
+        ):
+            self.search_results.pop()
+
+        if self.search_results and self.search_results[-1][0] == self.search_string:
+            return self.search_results[-1][1]
+
+        lookup = self._lookup()
+        cached = self.search_results[-1][1] if self.search_results else None
+        candidates: Iterable[str]
+        if cached is not None and (
+            lookup is None or (cached.done and cached.found <= len(lookup))
+        ):
+            candidates = cached
+        elif lookup is not None:
+            ranks = self._get_ranks()
+            candidates = sorted(
+                (command for command in lookup if command in ranks),
+                key=ranks.__getitem__,
             )
-        except re.error:
+        else:
+            candidates = self.to_restore[self.view]
+        # only the first page is actually scanned here, the rest on demand
+        # or in between keystrokes, see advance_scan()
+        matches = self._match(candidates, search_regex)
+        if not self.regex_mode:
+            self.search_results.append((self.search_string, matches))
+        return matches
+
+    def _lookup(self) -> Optional[Set[str]]:
+        """
+        Looks up the commands that may match in the trigram index of the
+        view, which the favorites do not have, as they are not all in the
+        history. The merged view has its own.
+        """
+        trigrams = self.merged_trigrams if self.view == View.MERGED else self.trigrams
+        if trigrams is None or self.view == View.FAVORITES or self.is_loading():
             return None
+        return trigrams.lookup(get_literals(self.search_string, self.regex_mode))
+
+    def _get_ranks(self) -> Dict[str, int]:
+        """
+        The position of every command in the view, to put what a lookup
+        found back in the order of the view without walking all of it.
+        """
+        if self.view not in self.ranks:
+            self.ranks[self.view] = {
+                command: rank for rank, command in enumerate(self.to_restore[self.view])
+            }
+        return self.ranks[self.view]
+
+    def _match(self, candidates: Iterable[str], search_regex: Pattern) -> Results:
+        # user regexes may backtrack catastrophically, escaped strings cannot
+        budget = MATCH_BUDGET if self.regex_mode else None
+        return Results(candidates, search_regex.search, budget)
 
-    def delete_from_history(self, command: str) -> None:
+    def _rank(self, candidates: Sequence[str], search_regex: Pattern) -> List[str]:
+        return self.matcher.search(
+            candidates,
+            search_regex,
+            self.search_string,
+            case_sensitivity=self.case_sensitivity,
+        )
+
+    def advance_scan(self) -> None:
+        commands = self.commands[self.view]
+        if isinstance(commands, Results):
+            with self.tracer.span("scan"):
+                commands.advance()
+
+    def create_search_regex(self) -> Optional[Pattern]:
+        return self.query.compile(
+            self.search_string,
+            self.regex_mode,
+            self.case_sensitivity,
+            self.fuzzy_mode,
+        )
+
+    def delete_from_history(self, *commands: str) -> None:
+        """
+        Deletes every occurrence of all the given commands at once, so a batch
+        costs one pass over the history and one write of the history file.
+
+        They are gone from the views right away, while the shell's history is
+        rewritten in the background, like it is loaded, before anything else
+        reads it, see _start_loading(), and before the shell goes on, see suspend().
+        """
+        self.wait_until_loaded()
+        self._wait_until_indexed()
+        self.delete_from_pyhstr(*commands)
+        for command in commands:
+            self.marked.pop(command, None)
+        if self.ranking is not None:
+            self.ranking.discard(*commands)
+        self.search_results.clear()
+        self._start_loading(partial(self._delete_from_shell, *commands))
+        self.deleter = self.loader
+
+    def _delete_from_shell(self, *commands: str) -> None:
         if SHELL == Shell.STANDARD:
-            self.delete_python_history(command)
+            self.delete_python_history(*commands)
+            # they were removed from readline's history
+            self.readline_history.skip()
         elif SHELL == Shell.IPYTHON:
-            self.delete_ipython_history(command)
+            self.delete_ipython_history(*commands)
         elif SHELL == Shell.BPYTHON:
-            self.delete_bpython_history(command)
+            self.delete_bpython_history(*commands)
         else:
             pass  # future implementations
 
-        self.delete_from_pyhstr(command)
-        self.to_restore = self.commands.copy()
-
-    def delete_python_history(self, command: str) -> None:  # pylint: disable=no-self-use
-        readline_history = [
-            readline.get_history_item(i + 1)
+    def delete_python_history(self, *commands: str) -> None:  # pylint: disable=no-self-use
+        deleted = set(commands)
+        readline = get_readline()
+        indexes = [
+            i
             for i in range(readline.get_current_history_length())
+            if readline.get_history_item(i + 1) in deleted
         ]
+        # from the end, so the indexes of the ones left to remove don't shift
+        for i in reversed(indexes):
+            readline.remove_history_item(i)
 
-        cmd_indexes = [i for i, cmd in enumerate(readline_history) if cmd == command]
+        path = SHELLS[Shell.STANDARD]["hist"]
+        assert path is not None
+        with replacing(path) as tmp:
+            readline.write_history_file(str(tmp))
 
-        for cmd_idx in reversed(cmd_indexes):
-            readline.remove_history_item(cmd_idx)
-
-        readline.write_history_file(str(SHELLS[Shell.STANDARD]["hist"]))
-
-    def delete_ipython_history(self, command: str) -> None:  # pylint: disable=no-self-use
-        IPython.get_ipython().history_manager.db.execute(
-            "DELETE FROM history WHERE source=(?)", (command,)
-        )
+    def delete_ipython_history(self, *commands: str) -> None:
+        # the commands shown are the raw ones, which is also what is indexed,
+        # committed right away, for the other connections to the database
+        with self._get_ipython_db() as db:
+            db.executemany(
+                "DELETE FROM history WHERE source_raw=(?)", [(cmd,) for cmd in commands]
+            )
 
-    def delete_bpython_history(self, command: str) -> None:
-        self.raw_history = [cmd for cmd in self.raw_history if cmd != command]
-        write(SHELLS[Shell.BPYTHON]["hist"], self.raw_history)
+    def delete_bpython_history(self, *commands: str) -> None:  # pylint: disable=no-self-use
+        deleted = set(commands)
+        history = read(SHELLS[Shell.BPYTHON]["hist"])
+        write(SHELLS[Shell.BPYTHON]["hist"], [cmd for cmd in history if cmd not in deleted])
 
-    def delete_from_pyhstr(self, command: str) -> None:
-        for view in self.commands.values():
-            for cmd in view:
-                if cmd == command:
-                    view.remove(cmd)
+    def delete_from_pyhstr(self, *commands: str) -> None:
+        """
+        Rebuilds every view with a single filtering pass. Views shared between
+        self.commands and self.to_restore stay shared. Results still being
+        found keep on being found lazily, see Results.without().
+        """
+        deleted = set(commands)
+        if self.trigrams is not None:
+            self.trigrams.discard(*deleted)
+        self.merged_trigrams.discard(*deleted)
+        self.ranks.clear()
+        self.matcher.reset()
+        rebuilt: Dict[int, Sequence[str]] = {}
+        for view, cmds in self.to_restore.items():
+            kept = [cmd for cmd in cmds if cmd not in deleted]
+            rebuilt[id(cmds)] = self.to_restore[view] = kept
+        for view, shown in self.commands.items():
+            if id(shown) not in rebuilt and isinstance(shown, Results):
+                rebuilt[id(shown)] = shown.without(deleted)
+            elif id(shown) not in rebuilt:
+                rebuilt[id(shown)] = [cmd for cmd in shown if cmd not in deleted]
+            self.commands[view] = rebuilt[id(shown)]
 
     def add_or_rm_fav(self, command: str) -> None:
-        favorites = self.commands[View.FAVORITES]
-        if command not in favorites:
+        self.wait_until_loaded()
+        self.matcher.reset()
+        added = self.favorites.toggle(command)
+        favorites = self.to_restore[View.FAVORITES]
+        if added:
             favorites.append(command)
-        else:
+        elif command in favorites:
             favorites.remove(command)
-        write(SHELLS[SHELL]["fav"], favorites)
+        if self.commands[View.FAVORITES] is not favorites:
+            # the favorites view is currently filtered by a search, redo it
+            search_regex = self.create_search_regex()
+            if search_regex is None:
+                self.commands[View.FAVORITES] = []
+            elif self.fuzzy_mode and self.search_string:
+                self.commands[View.FAVORITES] = self._rank(favorites, search_regex)
+            else:
+                self.commands[View.FAVORITES] = self._match(favorites, search_regex)
+        self.search_results.clear()
+
+    def toggle_mark(self, command: str) -> None:
+        if command in self.marked:
+            del self.marked[command]
+        else:
+            self.marked[command] = None
 
     def toggle_regex_mode(self) -> None:
-        self.regex_mode = not self.regex_mode
+        """
+        Cycles through plain, regex and fuzzy matching.
+        """
+        if self.regex_mode:
+            self.regex_mode = False
+            self.fuzzy_mode = True
+        elif self.fuzzy_mode:
+            self.fuzzy_mode = False
+        else:
+            self.regex_mode = True
 
     def toggle_case(self) -> None:
         self.case_sensitivity = not self.case_sensitivity
 
     def toggle_view(self) -> None:
-        self.view = View((self.view.value + 1) % 3)
+        self.view = View((self.view.value + 1) % len(View))
+        if self.view == View.MERGED and not self.merged:
+            self.merged = True
+            self.wait_until_loaded()
+            self._start_loading(self._merge)
+
+
+# the App of the last hh, kept alive for the next one in the same interpreter
+SESSION: Optional[App] = None
+
+
+def resume(stdscr: _CursesWindow) -> App:
+    """
+    Returns the App suspended by the previous hh, reopened on the new screen,
+    or a new App if there is none, or loading it failed.
+    """
+    global SESSION  # pylint: disable=global-statement
+    app, SESSION = SESSION, None
+    if app is None or app.load_error is not None:
+        return App(stdscr, background=True)
+    app.reopen(stdscr)
+    return app
+
+
+def suspend(app: App) -> None:
+    """
+    Keeps the App for the next hh, once this one is done with it.
+    The shell's history is done being deleted from by then,
+    or the shell may write it back as it was, e.g. when exiting.
+    """
+    global SESSION  # pylint: disable=global-statement
+    if app.deleter is not None:
+        app.deleter.join()
+        app.deleter = None
+    SESSION = app
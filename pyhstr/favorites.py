@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from pyhstr.utilities import read, write
+
+ADD = "+"
+REMOVE = "-"
+
+
+class Favorites:
+    """
+    Favorite commands as an insertion-ordered set, for constant-time
+    membership checks while keeping the order they were added in.
+
+    They are stored in the favorites file, one command per line, plus a
+    journal next to it with one `+command` or `-command` line per toggle
+    made since the favorites file was last written. Toggling only appends
+    to the journal, which is folded back into the favorites file once it
+    outgrows it.
+
+    With `load=False`, nothing is read until load() is called.
+    """
+
+    def __init__(self, path: Optional[Path], load: bool = True):
+        assert path is not None
+        self.path = path
+        self.journal = path.with_name(path.name + ".journal")
+        self.commands: Dict[str, None] = {}
+        self.journal_length = 0
+        if load:
+            self.load()
+
+    def load(self) -> None:
+        self.commands = dict.fromkeys(read(self.path))
+        self.journal_length = 0
+        try:
+            with open(self.journal, "r") as f:
+                for line in f:
+                    self._apply(line[0], line[1:].rstrip("\n"))
+                    self.journal_length += 1
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, command: object) -> bool:
+        return command in self.commands
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.commands)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def toggle(self, command: str) -> bool:
+        """
+        Adds the command if it is not a favorite yet, removes it otherwise.
+        Returns whether it was added.
+        """
+        operation = REMOVE if command in self.commands else ADD
+        self._apply(operation, command)
+        if self.journal_length >= len(self.commands):
+            self.compact()
+        else:
+            if not self.journal.parent.exists():
+                self.journal.parent.mkdir(exist_ok=True)
+            with open(self.journal, "a") as f:
+                print(operation + command, file=f)
+            self.journal_length += 1
+        return operation == ADD
+
+    def compact(self) -> None:
+        write(self.path, list(self.commands))
+        try:
+            self.journal.unlink()
+        except FileNotFoundError:
+            pass
+        self.journal_length = 0
+
+    def _apply(self, operation: str, command: str) -> None:
+        # re-adding moves the command to the end, like a fresh favorite
+        self.commands.pop(command, None)
+        if operation == ADD:
+            self.commands[command] = None
@@ -0,0 +1,230 @@
+# pylint: disable=too-few-public-methods
+
+import heapq
+import re
+from itertools import islice
+from typing import Dict, Iterable, List, Match, Optional, Pattern, Sequence, Tuple
+
+# how many of the best matches a fuzzy search keeps
+FUZZY_LIMIT = 500
+
+# how many candidates Ranked.advance() scores at a time
+FUZZY_CHUNK_SIZE = 500
+
+# score of every matched character, plus the bonuses when it follows the
+# previous one, or starts a word, minus a point per character skipped
+MATCH = 16
+CONTIGUOUS = 12
+BOUNDARY = 8
+MAX_GAP_PENALTY = 8
+
+# how much being first in the view is worth, the last one gets nothing
+RANK_WEIGHT = 16
+
+# the mask of a command that can match whatever the search string
+ALL_BITS = (1 << 64) - 1
+
+
+def compile_pattern(search_string: str, case_sensitivity: bool) -> Pattern:
+    """
+    Compiles a regex finding the search string's characters in order,
+    with as little as possible in between, one group per character,
+    e.g. `(a)[^b]*?(b)` for "ab".
+    """
+    parts = []
+    for idx, char in enumerate(search_string):
+        if idx:
+            parts.append(f"[^{re.escape(char)}]*?")
+        parts.append(f"({re.escape(char)})")
+    return re.compile(
+        "".join(parts), re.DOTALL | (re.IGNORECASE if not case_sensitivity else 0)
+    )
+
+
+def get_mask(text: str) -> int:
+    """
+    One bit per character, folded to 64 bits, so a command can only match
+    if its mask has all the bits of the search string's mask.
+
+    Beyond ASCII, lower() does not fold case like regexes do, e.g. "ſ" is
+    not "s", so text that is not all ASCII gets every bit, see search().
+    """
+    if not text.isascii():
+        return ALL_BITS
+    mask = 0
+    for char in set(text.lower()):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def get_positions(match: Match) -> List[int]:
+    # where the groups start, one per character of the search string
+    return [match.start(idx) for idx in range(1, (match.lastindex or 0) + 1)]
+
+
+def score(command: str, positions: List[int]) -> int:
+    total = 0
+    previous = -2
+    for position in positions:
+        total += MATCH
+        if position == previous + 1:
+            total += CONTIGUOUS
+        elif previous >= 0:
+            total -= min(position - previous - 1, MAX_GAP_PENALTY)
+        if position == 0 or not command[position - 1].isalnum():
+            total += BOUNDARY
+        elif command[position].isupper() and command[position - 1].islower():
+            total += BOUNDARY
+        previous = position
+    return total
+
+
+def get_spans(regex: Pattern, command: str) -> List[Tuple[int, int]]:
+    """
+    Returns the matched characters as (start, end) spans,
+    with adjacent characters merged into a single span.
+    """
+    match = regex.search(command)
+    spans: List[Tuple[int, int]] = []
+    if match is None:
+        return spans
+    for position in get_positions(match):
+        if spans and spans[-1][1] == position:
+            spans[-1] = (spans[-1][0], position + 1)
+        else:
+            spans.append((position, position + 1))
+    return spans
+
+
+class Ranked:
+    """
+    A fuzzy search in progress, scoring its candidates a chunk at a time,
+    see advance(), so it can run in between keystrokes. Only the best `limit`
+    matches are kept, in a heap, instead of sorting them all.
+
+    The candidates are commands with their position in the view, which is how
+    well they fare on frequency and recency. Every match is kept with its
+    position, a search string extending this one only matches those.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        view: Sequence[str],
+        candidates: Iterable[Tuple[int, str]],
+        regex: Pattern,
+        search_string: str,
+        case_sensitivity: bool,
+        masks: Dict[str, int],
+        limit: int = FUZZY_LIMIT,
+    ):
+        self.view = view
+        self.count = len(view)
+        self.candidates = iter(candidates)
+        self.regex = regex
+        self.search_string = search_string
+        self.case_sensitivity = case_sensitivity
+        # a search string that is not all ASCII rules nothing out
+        self.wanted = get_mask(search_string) if search_string.isascii() else 0
+        self.masks = masks
+        self.limit = limit
+        self.matched: List[Tuple[int, str]] = []
+        self.best: List[Tuple[float, int, str]] = []
+        self.done = False
+
+    def advance(self, chunk_size: int = FUZZY_CHUNK_SIZE) -> bool:
+        """
+        Scores the next chunk of candidates, returns whether all are scored.
+        """
+        if self.done:
+            return True
+        masks, wanted, regex = self.masks, self.wanted, self.regex
+        count, limit, best = self.count, self.limit, self.best
+        taken = 0
+        for idx, command in islice(self.candidates, chunk_size):
+            taken += 1
+            mask = masks.get(command)
+            if mask is None:
+                mask = masks[command] = get_mask(command)
+            if mask & wanted != wanted:
+                continue
+            match = regex.search(command)
+            if match is None:
+                continue
+            self.matched.append((idx, command))
+            rank = RANK_WEIGHT * (count - idx) / count
+            scored = (score(command, get_positions(match)) + rank, -idx, command)
+            if len(best) < limit:
+                heapq.heappush(best, scored)
+            elif scored > best[0]:
+                heapq.heapreplace(best, scored)
+        # the candidates ran out before the chunk was full
+        self.done = taken < chunk_size
+        return self.done
+
+    def finish(self) -> List[str]:
+        """
+        Scores whatever is left, returns the best matches, best first.
+        """
+        while not self.advance():
+            pass
+        return [command for _, _, command in sorted(self.best, reverse=True)]
+
+
+class Matcher:
+    """
+    Ranks commands by how well they fuzzily match the search string.
+
+    The character masks of the commands are kept around in between searches,
+    so most commands are ruled out by a single AND. A search extending the
+    last one finished only scores what that one matched.
+    """
+
+    def __init__(self) -> None:
+        self.masks: Dict[str, int] = {}
+        self.last: Optional[Ranked] = None
+        # the last search finished, see start()
+        self.previous: Optional[Ranked] = None
+
+    def start(
+        self,
+        view: Sequence[str],
+        regex: Pattern,
+        search_string: str,
+        limit: int = FUZZY_LIMIT,
+        case_sensitivity: bool = False,
+    ) -> Ranked:
+        """
+        Starts scoring the commands in the view by the match, and by their
+        rank in the view, for Ranked.advance() to go on with.
+        """
+        if self.last is not None and self.last.done:
+            self.previous = self.last
+        previous = self.previous
+        candidates: Iterable[Tuple[int, str]] = enumerate(view)
+        if (
+            previous is not None
+            and previous.view is view
+            and previous.case_sensitivity == case_sensitivity
+            and search_string.startswith(previous.search_string)
+        ):
+            candidates = previous.matched
+        self.last = Ranked(
+            view, candidates, regex, search_string, case_sensitivity, self.masks, limit
+        )
+        return self.last
+
+    def search(
+        self,
+        view: Sequence[str],
+        regex: Pattern,
+        search_string: str,
+        limit: int = FUZZY_LIMIT,
+        case_sensitivity: bool = False,
+    ) -> List[str]:
+        return self.start(view, regex, search_string, limit, case_sensitivity).finish()
+
+    def reset(self) -> None:
+        """
+        Forgets the searches made, for when the views changed.
+        """
+        self.last = self.previous = None
@@ -0,0 +1,235 @@
+import marshal
+import os
+import struct
+from collections import Counter
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from pyhstr.ranking import Ranking
+from pyhstr.utilities import replacing
+
+MAGIC = b"PYHSTRI2"
+
+# magic, history size, history mtime in ns, length of the history path,
+# length of the tail (the last bytes of the history that were indexed)
+HEADER = struct.Struct("<8sQqHB")
+
+TAIL_SIZE = 64
+
+# the index last loaded from or written to each index path, with the history
+# it is for, so loading again in the same interpreter, like the next hh does,
+# only takes a stat of the history when it did not change
+LOADED: Dict[Path, Tuple[Path, "Index"]] = {}
+
+
+class Index(NamedTuple):
+    size: int
+    mtime_ns: int
+    tail: bytes
+    ranking: Ranking
+
+
+def load(history: Optional[Path], index: Optional[Path]) -> Ranking:
+    """
+    Ranks the history file, reusing the index stored at `index`.
+
+    The index is keyed on the path, size and mtime of the history file.
+    If they all match, the ranking is loaded from the index without
+    touching the history. If the history only grew since it was indexed,
+    just the new lines are read and the index is updated. Otherwise,
+    the history is parsed from scratch and the index rebuilt.
+
+    History files have no timestamps, so the lines read are taken as run
+    when the history was last modified: rebuilt, the ranking is by count,
+    and every update ranks what was appended since above what was there.
+    """
+    assert history is not None and index is not None
+    try:
+        stat = history.stat()
+    except FileNotFoundError:
+        return Ranking([""])
+
+    loaded = LOADED.get(index)
+    if loaded is not None and loaded[0] == history:
+        cached: Optional[Index] = loaded[1]
+    else:
+        cached = _read_index(index, history)
+    if (
+        cached is not None
+        and cached.size == stat.st_size
+        and cached.mtime_ns == stat.st_mtime_ns
+    ):
+        LOADED[index] = (history, cached)
+        return cached.ranking
+
+    with open(history, "rb") as f:
+        if cached is not None and _is_appended(f, cached, stat.st_size):
+            f.seek(cached.size)
+            data = f.read()
+            ranking = cached.ranking
+            ranking.update(_parse(data), stat.st_mtime)
+            tail = (cached.tail + data)[-TAIL_SIZE:]
+        else:
+            data = f.read()
+            ranking = Ranking(_parse(data), stat.st_mtime)
+            tail = data[-TAIL_SIZE:]
+        size = f.tell()
+
+    cached = Index(size, stat.st_mtime_ns, tail, ranking)
+    _write_index(index, history, cached)
+    LOADED[index] = (history, cached)
+    return ranking
+
+
+def _is_appended(f: BinaryIO, cached: Index, size: int) -> bool:
+    """
+    The history counts as appended to if it grew, still starts with
+    what was indexed, and what was indexed ended with a complete line.
+    Only the tail of the indexed part is compared, which catches
+    rewrites like readline's history truncation or deletions.
+    """
+    if size <= cached.size:
+        return False
+    if cached.size and not cached.tail.endswith(b"\n"):
+        return False
+    f.seek(cached.size - len(cached.tail))
+    return f.read(len(cached.tail)) == cached.tail
+
+
+def _parse(data: bytes) -> List[str]:
+    """
+    Splits like utilities.read does (universal newlines, stripped lines).
+    """
+    text = data.decode(errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [line.strip() for line in lines]
+
+
+def _read_index(index: Path, history: Path) -> Optional[Index]:
+    try:
+        with open(index, "rb") as f:
+            data = f.read()
+        header = _read_header(data, history)
+        if header is None:
+            return None
+        size, mtime_ns, tail, offset = header
+        ranking = _read_ranking(data[offset:])
+    except (OSError, EOFError, ValueError, TypeError, IndexError, struct.error):
+        return None
+    return Index(size, mtime_ns, tail, ranking)
+
+
+def _read_header(data: bytes, history: Path) -> Optional[Tuple[int, int, bytes, int]]:
+    """
+    Returns the history size, mtime and tail, and where the ranking starts,
+    or None if the index is not one for `history`.
+    """
+    magic, size, mtime_ns, path_length, tail_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    offset = HEADER.size
+    if data[offset : offset + path_length] != os.fsencode(history):
+        return None
+    offset += path_length
+    return size, mtime_ns, data[offset : offset + tail_length], offset + tail_length
+
+
+def _read_ranking(payload: bytes) -> Ranking:
+    commands, counts, scores, epoch, positions, ranked, length = marshal.loads(
+        payload
+    )
+    ranking = Ranking()
+    ranking.counts = Counter(dict(zip(commands, counts)))
+    ranking.scores = dict(zip(commands, scores))
+    ranking.epoch = epoch
+    ranking.positions = dict(zip(commands, positions))
+    ranking.ranked = [commands[i] for i in ranked]
+    ranking.length = length
+    return ranking
+
+
+def _write_index(index: Path, history: Path, cached: Index) -> None:
+    ranking = cached.ranking
+    commands = list(ranking.counts)
+    numbers = {command: i for i, command in enumerate(commands)}
+    path = os.fsencode(history)
+    payload = marshal.dumps(
+        (
+            commands,
+            [ranking.counts[command] for command in commands],
+            [ranking.scores[command] for command in commands],
+            ranking.epoch,
+            [ranking.positions[command] for command in commands],
+            [numbers[command] for command in ranking.sorted()],
+            ranking.length,
+        )
+    )
+    header = HEADER.pack(
+        MAGIC, cached.size, cached.mtime_ns, len(path), len(cached.tail)
+    )
+    try:
+        index.parent.mkdir(parents=True, exist_ok=True)
+        with replacing(index) as tmp, open(tmp, "wb") as f:
+            f.write(header + path + cached.tail + payload)
+    except OSError:
+        # the index is only a cache, pyhstr works fine without it
+        pass
+
+
+def stamp(
+    path: Optional[Path], counts: Mapping[str, int], now: float
+) -> Dict[str, float]:
+    """
+    Returns when each command was last run, as far as can be told for
+    a history without timestamps, like readline's: when it was first seen
+    run as many times as in `counts`. The times are kept at `path` for
+    the next session, without it every command counts as run `now`.
+    """
+    if path is None:
+        return {}
+    seen, times = _read_stamps(path)
+    stamps = {}
+    changed = len(seen) != len(counts)
+    for command, count in counts.items():
+        known = seen.get(command, 0)
+        if known < count:
+            stamps[command] = now
+            changed = True
+        else:
+            stamps[command] = times[command]
+            changed = changed or known != count
+    if changed:
+        _write_stamps(path, counts, stamps)
+    return stamps
+
+
+def _read_stamps(path: Path) -> Tuple[Dict[str, int], Dict[str, float]]:
+    # two dicts, not one of tuples, which the garbage collector would track
+    try:
+        with open(path, "rb") as f:
+            commands, counts, times = marshal.loads(f.read())
+        return dict(zip(commands, counts)), dict(zip(commands, times))
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}, {}
+
+
+def _write_stamps(
+    path: Path, counts: Mapping[str, int], stamps: Dict[str, float]
+) -> None:
+    commands = list(counts)
+    payload = marshal.dumps(
+        (
+            commands,
+            [counts[command] for command in commands],
+            [stamps[command] for command in commands],
+        )
+    )
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with replacing(path) as tmp, open(tmp, "wb") as f:
+            f.write(payload)
+    except OSError:
+        # like the index, the times are only nice to have
+        pass
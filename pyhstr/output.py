@@ -0,0 +1,79 @@
+# pylint: disable=too-few-public-methods
+
+import functools
+import readline
+import sys
+
+from pyhstr.sources import get_readline
+from pyhstr.utilities import Shell, echo
+
+
+class Output:
+    """
+    Puts the selected command on the shell's next prompt.
+
+    The generic way is TIOCSTI, which fakes terminal input one byte per
+    syscall. That is slow for long commands, can interleave with typeahead,
+    and newer kernels may refuse it altogether, so the shells that let us
+    hand them the text directly get a backend of their own.
+    """
+
+    def inject(self, command: str, run: bool = False) -> None:
+        echo(command)
+        if run:
+            echo("\n")
+
+
+class ReadlineOutput(Output):
+    """
+    Inserts the command into readline's line buffer from the pre-input hook,
+    which readline calls once the next prompt is shown. The REPL of Python
+    3.13+ has no such hook, see get_output().
+    """
+
+    def inject(self, command: str, run: bool = False) -> None:
+        def hook() -> None:
+            readline.set_pre_input_hook(None)
+            readline.insert_text(command)
+            readline.redisplay()
+
+        readline.set_pre_input_hook(hook)
+        if run:
+            # readline reads this right after running the hook
+            _echo_newline()
+
+
+class IPythonOutput(Output):
+    """
+    Makes the command the default text of IPython's next prompt.
+    """
+
+    def inject(self, command: str, run: bool = False) -> None:
+        sys.modules["IPython"].get_ipython().set_next_input(command)
+        if run:
+            _echo_newline()
+
+
+def _echo_newline() -> None:
+    try:
+        echo("\n")
+    except OSError:
+        # TIOCSTI is disabled, the command is left on the prompt to be run
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_output(shell: Shell) -> Output:
+    """
+    Picks the fastest backend available for the shell, once per session.
+    """
+    if (
+        shell == Shell.STANDARD
+        # not the new REPL's readline, whose pre-input hook is a stub
+        and get_readline() is readline
+        and hasattr(readline, "set_pre_input_hook")
+    ):
+        return ReadlineOutput()
+    if shell == Shell.IPYTHON:
+        return IPythonOutput()
+    return Output()
@@ -0,0 +1,163 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# how long it takes for a run of a command to count half as much, in seconds
+HALF_LIFE = 14 * 24 * 60 * 60
+
+# past this many half-lives since the epoch, the scores are scaled down
+# to a new epoch, long before they could overflow
+MAX_HALF_LIVES = 512
+
+# updates touching more than this share of the commands sort them anew,
+# instead of moving the commands touched one by one
+RESORT_RATIO = 1 / 64
+
+
+def decay(timestamp: float, now: float) -> float:
+    """
+    How much a run of a command at `timestamp` counts at `now`.
+    """
+    return 2 ** ((timestamp - now) / HALF_LIFE)
+
+
+class Ranking:
+    """
+    Keeps the number of occurrences, the frecency score and the last
+    position of every command seen so far, so ranking a history is a
+    single pass over it followed by a sort of the unique commands only.
+
+    Every run of a command adds 2 ** ((timestamp - epoch) / HALF_LIFE) to
+    its score, which is its exponentially decayed frequency as of the epoch.
+    Decaying all the scores to any later time scales them all the same,
+    so the order never changes just because time passes, and a new run
+    updates a single score. Runs without a timestamp count as of the epoch.
+    """
+
+    def __init__(
+        self, commands: Iterable[str] = (), timestamp: Optional[float] = None
+    ):
+        # Counter preserves insertion order, so its keys
+        # are the unique commands in order of first occurrence
+        self.counts: Counter = Counter()
+        self.scores: Dict[str, float] = {}
+        self.epoch: Optional[float] = None
+        self.positions: Dict[str, int] = {}
+        self.length = 0
+        # sorted() result, kept up to date by update()
+        self.ranked: Optional[List[str]] = None
+        self.update(commands, timestamp)
+
+    def update(
+        self,
+        commands: Iterable[str],
+        timestamp: Optional[float] = None,
+        stamps: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """
+        Adds commands run at `timestamp`, or at an unknown time if it is None.
+        The commands in `stamps` count as run at the time given there instead.
+        """
+        if not isinstance(commands, list):
+            commands = list(commands)
+        runs = Counter(commands)
+        ranked = self.ranked
+        if ranked is not None and len(runs) > len(ranked) * RESORT_RATIO:
+            ranked = self.ranked = None
+        if ranked is not None:
+            for command in runs:
+                if command in self.positions:
+                    del ranked[self._bisect(ranked, self._key(command))]
+
+        weight = self._weigh(timestamp)
+        scores = self.scores
+        if stamps is None:
+            for command, count in runs.items():
+                scores[command] = scores.get(command, 0.0) + count * weight
+        else:
+            # the stamps are the times of a few sessions, weighed once each
+            weights = {timestamp: weight}
+            for command, count in runs.items():
+                stamp = stamps.get(command, timestamp)
+                if stamp not in weights:
+                    weights[stamp] = self._weigh(stamp)
+                scores[command] = scores.get(command, 0.0) + count * weights[stamp]
+        self.counts.update(runs)
+        # later occurrences overwrite earlier ones, leaving the last position
+        end = self.length + len(commands)
+        self.positions.update(zip(commands, range(self.length, end)))
+        self.length = end
+
+        if ranked is not None:
+            for command in runs:
+                ranked.insert(self._bisect(ranked, self._key(command)), command)
+
+    def extend(self, ranked: Iterable[Tuple[str, float, int, int]]) -> None:
+        """
+        Adds commands ranked elsewhere, like in SQLite, as they rank below
+        all the others, each with its score, count and last position.
+        Later updates count as run after all of them.
+        """
+        if self.ranked is None:
+            self.sorted()
+        assert self.ranked is not None
+        for command, score, count, position in ranked:
+            self.scores[command] = score
+            self.counts[command] = count
+            self.positions[command] = position
+            self.ranked.append(command)
+            self.length = max(self.length, position + 1)
+
+    def discard(self, *commands: str) -> None:
+        for command in commands:
+            if command not in self.positions:
+                continue
+            if self.ranked is not None:
+                del self.ranked[self._bisect(self.ranked, self._key(command))]
+            del self.counts[command]
+            del self.scores[command]
+            del self.positions[command]
+
+    def _weigh(self, timestamp: Optional[float]) -> float:
+        if timestamp is None:
+            return 1.0
+        if self.epoch is None:
+            self.epoch = timestamp
+        elif timestamp - self.epoch > MAX_HALF_LIVES * HALF_LIFE:
+            # rebasing scales every score the same, the order stays
+            scale = decay(self.epoch, timestamp)
+            for command in self.scores:
+                self.scores[command] *= scale
+            self.epoch = timestamp
+        return decay(timestamp, self.epoch)
+
+    def _key(self, command: str) -> Tuple[float, int]:
+        return -self.scores[command], -self.positions[command]
+
+    def _bisect(self, ranked: List[str], key: Tuple[float, int]) -> int:
+        low, high = 0, len(ranked)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(ranked[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def sorted(self) -> List[str]:
+        """
+        Highest score first, ties broken by the most recent last occurrence.
+        Without timestamps, the score is the number of occurrences.
+        """
+        if self.ranked is None:
+            # both sorts are stable, so sorting by position first
+            # leaves it as the tie-breaker of the sort by score
+            by_position = sorted(
+                self.positions, key=self.positions.__getitem__, reverse=True
+            )
+            self.ranked = sorted(
+                by_position, key=self.scores.__getitem__, reverse=True
+            )
+        return list(self.ranked)
+
+    def unique(self) -> List[str]:
+        return list(self.counts)
@@ -0,0 +1,344 @@
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
+
+from pyhstr import fuzzy
+
+# match spans are memoized for this many commands, a few pages' worth
+SPANS_CACHE_SIZE = 1024
+
+# how many candidates Results.advance() checks at a time
+SCAN_CHUNK_SIZE = 5000
+
+# how long typing has to pause before a search starts, in seconds
+SEARCH_DEBOUNCE = 0.03
+
+# how long a regex search may spend matching in all, in seconds,
+# and how long highlighting the matches in a single command may take
+MATCH_BUDGET = 1.0
+SPANS_BUDGET = 0.02
+
+
+class TooSlow(Exception):
+    """
+    Raised by time_limit() once the time is up.
+    """
+
+
+@contextmanager
+def time_limit(seconds: float) -> Iterator[None]:
+    """
+    Raises TooSlow in the block once `seconds` have passed, with SIGALRM.
+    That interrupts even a single catastrophically backtracking match,
+    as the regex engine checks for signals as it goes.
+
+    Signals are only handled by the main thread, so anywhere else,
+    or when a timer is set already, there is no limit.
+    """
+    if (
+        threading.current_thread() is not threading.main_thread()
+        or signal.getitimer(signal.ITIMER_REAL)[0]
+    ):
+        yield
+        return
+
+    armed = True
+
+    def alarm(signum: int, frame: Any) -> None:  # pylint: disable=unused-argument
+        # the alarm may go off just as the block is left
+        if armed:
+            raise TooSlow
+
+    previous = signal.signal(signal.SIGALRM, alarm)
+    signal.setitimer(signal.ITIMER_REAL, max(seconds, 1e-6))
+    try:
+        yield
+    finally:
+        armed = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class Query:
+    """
+    The compiled search regex, shared by filtering and highlighting.
+
+    It is recompiled only when the search string, the regex mode or the case
+    sensitivity change, which also drops the match spans memoized for it.
+    In fuzzy mode, it finds the search string's characters in order,
+    see fuzzy.compile_pattern().
+    """
+
+    def __init__(self) -> None:
+        self.key: Optional[Tuple[str, bool, bool, bool]] = None
+        self.regex: Optional[Pattern] = None
+        self.spans: Dict[str, List[Tuple[int, int]]] = {}
+
+    def compile(
+        self,
+        search_string: str,
+        regex_mode: bool,
+        case_sensitivity: bool,
+        fuzzy_mode: bool = False,
+    ) -> Optional[Pattern]:
+        key = (search_string, regex_mode, case_sensitivity, fuzzy_mode)
+        if key != self.key:
+            self.key = key
+            self.spans = {}
+            if fuzzy_mode:
+                self.regex = fuzzy.compile_pattern(search_string, case_sensitivity)
+                return self.regex
+            try:
+                self.regex = re.compile(
+                    search_string if regex_mode else re.escape(search_string),
+                    re.IGNORECASE if not case_sensitivity else 0,
+                )
+            except re.error:
+                self.regex = None
+        return self.regex
+
+    def get_spans(self, command: str) -> List[Tuple[int, int]]:
+        """
+        Returns the (start, end) spans of the matches,
+        with adjacent matches merged into a single span.
+        """
+        try:
+            return self.spans[command]
+        except KeyError:
+            pass
+
+        spans: List[Tuple[int, int]] = []
+        if self.regex is not None and self.key is not None and self.key[3]:
+            spans = fuzzy.get_spans(self.regex, command)
+        elif self.regex is not None:
+            regex_mode = self.key is not None and self.key[1]
+            try:
+                with time_limit(SPANS_BUDGET) if regex_mode else nullcontext():
+                    for match in self.regex.finditer(command):
+                        start, end = match.span()
+                        if start == end:
+                            continue
+                        if spans and spans[-1][1] == start:
+                            spans[-1] = (spans[-1][0], end)
+                        else:
+                            spans.append((start, end))
+            except TooSlow:
+                # highlight what was found in time
+                pass
+
+        if len(self.spans) >= SPANS_CACHE_SIZE:
+            self.spans.clear()
+        self.spans[command] = spans
+        return spans
+
+
+class Results(Sequence[str]):
+    """
+    The candidates that match, found lazily: indexing and slicing scan only
+    as far as needed to answer, and advance() continues the scan a chunk at
+    a time in between keystrokes. The candidates may be another Results,
+    which is then scanned lazily as well, advance() included: a chunk only
+    takes the matches it has found so far, after advancing it a chunk too.
+
+    len() finishes the scan, `found` and `done` tell how far it got without
+    scanning any further.
+
+    Given a `budget`, matching stops once it took that many seconds in all,
+    leaving the matches found so far, and `too_slow` set.
+    """
+
+    def __init__(
+        self,
+        candidates: Iterable[str],
+        match: Callable[[str], Any],
+        budget: Optional[float] = None,
+    ):
+        # how many matches of the candidates that are Results were taken
+        self.taken = 0
+        self.source: Optional[Results] = None
+        if isinstance(candidates, Results):
+            self.source = candidates
+            self.candidates: Iterator[str] = self._take(candidates)
+        else:
+            self.candidates = iter(candidates)
+        self.match = match
+        self.matches: List[str] = []
+        self.done = False
+        self.budget = budget
+        self.elapsed = 0.0
+        self.too_slow = False
+
+    @property
+    def found(self) -> int:
+        return len(self.matches)
+
+    def fill(self, count: Optional[int] = None) -> None:
+        """
+        Scans until `count` matches are found, or to the end if it is None.
+        """
+        if self.done or (count is not None and len(self.matches) >= count):
+            return
+        with self._limited():
+            self._fill(count)
+
+    def _fill(self, count: Optional[int]) -> None:
+        match = self.match
+        matches = self.matches
+        for candidate in self.candidates:
+            if match(candidate):
+                matches.append(candidate)
+                if count is not None and len(matches) >= count:
+                    return
+        self.done = True
+
+    def advance(self, chunk_size: int = SCAN_CHUNK_SIZE) -> bool:
+        """
+        Checks the next chunk of candidates, returns whether the scan is done.
+        """
+        if not self.done:
+            with self._limited():
+                self._advance(chunk_size)
+        return self.done
+
+    def _advance(self, chunk_size: int) -> None:
+        source = self.source
+        if source is not None and not source.done:
+            # or taking a single candidate may scan all of the source
+            source.advance(chunk_size)
+            chunk_size = min(chunk_size, source.found - self.taken)
+        for _ in range(chunk_size):
+            candidate = next(self.candidates, None)
+            if candidate is None:
+                self.done = True
+                return
+            if self.match(candidate):
+                self.matches.append(candidate)
+
+    def without(self, commands: Container[str]) -> "Results":
+        """
+        Returns these results less the given commands: the matches found so
+        far are filtered right away, the rest of the scan goes on lazily.
+        """
+        results = Results(self, lambda candidate: candidate not in commands)
+        results.matches = [cmd for cmd in self.matches if cmd not in commands]
+        results.taken = len(self.matches)
+        results.done = self.done
+        results.too_slow = self.too_slow
+        return results
+
+    def _take(self, source: "Results") -> Iterator[str]:
+        while True:
+            if self.taken < len(source.matches):
+                self.taken += 1
+                yield source.matches[self.taken - 1]
+            elif source.done:
+                return
+            else:
+                source.fill(self.taken + 1)
+
+    @contextmanager
+    def _limited(self) -> Iterator[None]:
+        if self.budget is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            with time_limit(self.budget - self.elapsed):
+                yield
+        except TooSlow:
+            self.too_slow = True
+            self.done = True
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def __iter__(self) -> Iterator[str]:
+        idx = 0
+        while True:
+            if idx < len(self.matches):
+                yield self.matches[idx]
+                idx += 1
+            elif self.done:
+                return
+            else:
+                self.fill(idx + 1)
+
+    def __len__(self) -> int:
+        self.fill()
+        return len(self.matches)
+
+    @overload
+    def __getitem__(self, idx: int) -> str:
+        ...
+
+    @overload
+    def __getitem__(self, idx: slice) -> List[str]:
+        ...
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(idx, slice):
+            start, stop = idx.start or 0, idx.stop
+        else:
+            start, stop = idx, idx + 1
+        if start < 0 or stop is None or stop < 0 or (stop == 0 and start == -1):
+            # counted from the end
+            self.fill()
+        else:
+            self.fill(stop)
+        return self.matches[idx]
+
+
+class ScheduledSearch:
+    """
+    A search typed but not shown yet: when it is due, once typing pauses,
+    and its results while their first page is being found, or in fuzzy mode,
+    while the candidates are being ranked.
+    """
+
+    def __init__(self) -> None:
+        self.due: Optional[float] = None
+        self.results: Optional[Results] = None
+        self.ranked: Optional[fuzzy.Ranked] = None
+
+    def schedule(self, delay: float) -> None:
+        self.due = time.monotonic() + delay
+        self.results = None
+        self.ranked = None
+
+    def cancel(self) -> None:
+        self.due = None
+        self.results = None
+        self.ranked = None
+
+    def is_started(self) -> bool:
+        return self.results is not None or self.ranked is not None
+
+    def is_pending(self) -> bool:
+        return self.due is not None
+
+    def is_due(self) -> bool:
+        return self.due is not None and time.monotonic() >= self.due
+
+    def get_delay(self) -> int:
+        """
+        How many milliseconds are left until the search starts.
+        """
+        if self.due is None or self.is_started():
+            return 0
+        return max(0, int((self.due - time.monotonic()) * 1000) + 1)
@@ -0,0 +1,164 @@
+import heapq
+import os
+import readline
+import sys
+from operator import itemgetter
+from pathlib import Path
+from types import ModuleType
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+
+class Source(NamedTuple):
+    """
+    A history to merge, and what to tag its commands with.
+    Paths ending in .sqlite are IPython history databases,
+    anything else a history file with a command per line.
+    """
+
+    tag: str
+    path: Path
+
+
+def read_config(config: Path) -> List[Source]:
+    """
+    Reads the extra histories to merge, one per line, either just the path,
+    then tagged with the name of the directory it is in, or `tag=path`.
+    Empty lines and lines starting with # are skipped.
+    """
+    sources = []
+    try:
+        with open(config, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                tag, _, path = line.partition("=") if "=" in line else ("", "", line)
+                expanded = Path(path.strip()).expanduser()
+                sources.append(Source(tag.strip() or expanded.parent.name, expanded))
+    except FileNotFoundError:
+        pass
+    return sources
+
+
+def get_sources(shells: Iterable[Source], config: Path) -> List[Source]:
+    """
+    The histories of the shells, then the ones from the config,
+    leaving out those that do not exist (or not here).
+    """
+    sources = []
+    seen = set()
+    for source in [*shells, *read_config(config)]:
+        if source.path in seen or not source.path.is_file():
+            continue
+        seen.add(source.path)
+        sources.append(source)
+    return sources
+
+
+def iter_source(path: Path) -> Iterator[Tuple[float, str]]:
+    """
+    Yields the commands in the order they were run, each with how far into
+    the history it is, from 0 to 1, which is what the histories are merged on.
+    """
+    if path.suffix == ".sqlite":
+        return _iter_database(path)
+    return _iter_file(path)
+
+
+def _iter_file(path: Path) -> Iterator[Tuple[float, str]]:
+    with open(path, "rb") as f:
+        size = max(path.stat().st_size, 1)
+        offset = 0
+        for line in f:
+            offset += len(line)
+            yield offset / size, line.decode("utf-8", errors="replace").strip()
+
+
+def _iter_database(path: Path) -> Iterator[Tuple[float, str]]:
+    import sqlite3  # pylint: disable=import-outside-toplevel
+
+    try:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        (count,) = db.execute("SELECT COUNT(*) FROM history").fetchone()
+        cursor = db.execute("SELECT source_raw FROM history ORDER BY session, line")
+    except sqlite3.Error:
+        # e.g. locked, or not an IPython history after all
+        return
+    try:
+        for row_number, (command,) in enumerate(cursor, 1):
+            yield row_number / max(count, 1), command
+    finally:
+        db.close()
+
+
+def merge(sources: Iterable[Source]) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the commands of all the sources, interleaved by how far into
+    their history they are, each with the tag of the source it was first
+    seen in. The sources are read as the merge goes, a line at a time,
+    and a command only comes up once.
+    """
+    streams = [_tagged(source) for source in sources]
+    seen = set()
+    for _, tag, command in heapq.merge(*streams, key=itemgetter(0)):
+        if command and command not in seen:
+            seen.add(command)
+            yield command, tag
+
+
+def _tagged(source: Source) -> Iterator[Tuple[float, str, str]]:
+    for position, command in iter_source(source.path):
+        yield position, source.tag, command
+
+
+def get_readline() -> ModuleType:
+    """
+    The readline the standard shell keeps its history in. From Python 3.13,
+    unless PYTHON_BASIC_REPL is set, that is the new REPL's own, and GNU
+    readline's history is empty, see site.register_readline().
+    """
+    if sys.version_info < (3, 13) or (
+        os.getenv("PYTHON_BASIC_REPL") and not sys.flags.ignore_environment
+    ):
+        return readline
+    try:
+        # pylint: disable=import-outside-toplevel
+        import _pyrepl.readline  # type: ignore
+        from _pyrepl.main import CAN_USE_PYREPL  # type: ignore
+    except ImportError:
+        return readline
+    return _pyrepl.readline if CAN_USE_PYREPL else readline
+
+
+class ReadlineHistory:
+    """
+    The standard shell's history as readline has it: the history file as it
+    was read at startup, then every command run since, including the ones
+    of this session, which only reach the file at exit. Entries are read
+    by index, only those past the last one read, without any file I/O.
+    """
+
+    def __init__(self) -> None:
+        self.consumed = 0
+
+    def read(self) -> List[str]:
+        """
+        Returns the entries added since the last read, or all the first time.
+        """
+        repl_readline = get_readline()
+        length = repl_readline.get_current_history_length()
+        entries = [
+            entry.strip()
+            for entry in map(
+                repl_readline.get_history_item, range(self.consumed + 1, length + 1)
+            )
+            if entry is not None
+        ]
+        self.consumed = length
+        return entries
+
+    def skip(self) -> None:
+        """
+        Marks every entry as read, e.g. after rebuilding readline's history.
+        """
+        self.consumed = get_readline().get_current_history_length()
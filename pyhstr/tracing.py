@@ -0,0 +1,167 @@
+"""
+Opt-in timing of pyhstr's hot paths, to find out what is slow on a given box.
+
+Tracing is turned on by the PYHSTR_TRACE environment variable, or else by
+the first line of CONFIG, set to "on", or to "status" to also show the last
+timings in the status line. Spans are appended to TRACE as JSON lines once
+hh is done. Summarize them with: python -m pyhstr.tracing [trace.jsonl]
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager, Dict, Iterator, List, Optional, Tuple
+
+ENV = "PYHSTR_TRACE"
+CONFIG = Path("~/.config/pyhstr/trace").expanduser()
+TRACE = Path("~/.config/pyhstr/trace.jsonl").expanduser()
+
+OFF = {"", "0", "off", "no", "false"}
+STATUS = "status"
+
+# shown in the status line in this order, when they were timed
+OVERLAID = ("load", "search", "scan", "render")
+
+
+class Tracer:
+    """
+    Times spans of work with perf_counter_ns and keeps them until flushed.
+    Disabled, i.e. without a path, a span is a no-op context manager.
+    """
+
+    def __init__(self, path: Optional[Path] = None, overlay: bool = False):
+        self.path = path
+        self.overlay = overlay
+        # the background loader records spans too
+        self.lock = threading.Lock()
+        self.spans: List[Tuple[str, int, int]] = []
+        self.last: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def span(self, phase: str) -> ContextManager[None]:
+        if self.path is None:
+            return nullcontext()
+        return self._span(phase)
+
+    @contextmanager
+    def _span(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            with self.lock:
+                self.spans.append((phase, start, duration))
+                self.last[phase] = duration
+
+    def get_overlay(self) -> str:
+        """
+        The last timing of each phase, e.g. "search 1.2 render 0.4 ms".
+        """
+        with self.lock:
+            timed = [
+                f"{phase} {self.last[phase] / 1e6:.1f}"
+                for phase in OVERLAID
+                if phase in self.last
+            ]
+        return f"{' '.join(timed)} ms" if timed else "no timings yet"
+
+    def flush(self) -> None:
+        if self.path is None:
+            return
+        with self.lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        pid = os.getpid()
+        lines = "".join(
+            json.dumps(
+                {"phase": phase, "start_ns": start, "duration_ns": duration, "pid": pid}
+            )
+            + "\n"
+            for phase, start, duration in spans
+        )
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(lines)
+        except OSError:
+            # tracing must never get in the way of using pyhstr
+            pass
+
+
+def get_tracer() -> Tracer:
+    setting = os.environ.get(ENV)
+    if setting is None:
+        try:
+            with open(CONFIG, "r") as f:
+                setting = f.readline()
+        except OSError:
+            setting = ""
+    setting = setting.strip().lower()
+    if setting in OFF:
+        return Tracer()
+    return Tracer(TRACE, overlay=setting == STATUS)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    # nearest rank, values sorted
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(path: Path) -> Dict[str, Dict[str, float]]:
+    """
+    Returns the count and the percentiles of the durations of each phase,
+    in milliseconds. Lines that are not spans are skipped.
+    """
+    durations: Dict[str, List[float]] = {}
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+                phase, duration = span["phase"], span["duration_ns"] / 1e6
+            except (ValueError, KeyError, TypeError):
+                continue
+            durations.setdefault(phase, []).append(duration)
+    summary = {}
+    for phase, values in durations.items():
+        values.sort()
+        summary[phase] = {
+            "count": len(values),
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "p99": percentile(values, 0.99),
+            "max": values[-1],
+        }
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    path = Path(args[0]) if args else TRACE
+    try:
+        summary = summarize(path)
+    except OSError as error:
+        print(f"Cannot read {path}: {error.strerror}", file=sys.stderr)
+        return 1
+    print(f"{'phase':>8} {'count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for phase, stats in sorted(summary.items()):
+        print(
+            f"{phase:>8} {stats['count']:7} "
+            + " ".join(
+                f"{stats[key]:6.2f} ms" for key in ("p50", "p90", "p99", "max")
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import re
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+try:
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:  # pragma: no cover
+    import sre_parse  # pylint: disable=deprecated-module
+
+
+# intersecting with a posting this many times longer than the commands left
+# looks each of them up in it by bisection, instead of walking all of it
+BISECT_RATIO = 32
+
+# with this few commands left, checking them against the regex takes
+# less than intersecting them with any more postings
+FEW_COMMANDS = 1000
+
+# a lookup whose rarest trigram is in more than this share of the commands
+# finds too many to beat scanning the view for the first page of matches
+DENSE_SHARE = 1 / 64
+
+
+def get_trigrams(text: str) -> Set[str]:
+    # lowercased, so the index serves case insensitive searches too,
+    # which only folds case like regexes do for ASCII text: beyond it,
+    # "ſ" matches "s", and lower() turns a final "Σ" into "ς", not "σ"
+    text = text.lower()
+    return {text[idx : idx + 3] for idx in range(len(text) - 2)}
+
+
+def get_literals(search_string: str, regex_mode: bool) -> List[str]:
+    """
+    Returns strings every command matching the search has to contain.
+
+    For a regex, those are its runs of plain characters outside of groups,
+    alternatives and repetitions, e.g. "import " and "as" for `import \\w+ as`.
+    """
+    if not regex_mode:
+        return [search_string]
+    try:
+        parsed = sre_parse.parse(search_string)
+    except (re.error, RecursionError, OverflowError):
+        return []
+
+    literals: List[str] = []
+    current: List[str] = []
+    for op, arg in parsed:
+        if op == sre_parse.LITERAL:
+            current.append(chr(arg))
+        elif current:
+            literals.append("".join(current))
+            current = []
+    if current:
+        literals.append("".join(current))
+    return literals
+
+
+class TrigramIndex:
+    """
+    Maps every three characters to the commands containing them, lowercased.
+
+    The commands containing a string are then among the intersection
+    of the commands containing each of its trigrams, which only takes
+    as long as the rarest trigram has commands. Those candidates still
+    have to be checked against the search regex.
+
+    Commands are numbered as they are added, and each trigram maps to an
+    array of the numbers of its commands, in order, which takes a fraction
+    of the memory sets of strings would. Commands that are not all ASCII
+    are not split into trigrams, but are candidates for every lookup,
+    see get_trigrams().
+    """
+
+    def __init__(self, commands: Iterable[str] = ()):
+        # by number, None once discarded
+        self.commands: List[Optional[str]] = []
+        self.numbers: Dict[str, int] = {}
+        self.postings: Dict[str, array] = {}
+        self.unindexed = array("I")
+        self.add(commands)
+
+    def add(self, commands: Iterable[str]) -> None:
+        postings = self.postings
+        numbers = self.numbers
+        for command in commands:
+            if command in numbers:
+                continue
+            number = numbers[command] = len(self.commands)
+            self.commands.append(command)
+            if not command.isascii():
+                self.unindexed.append(number)
+                continue
+            for trigram in get_trigrams(command):
+                try:
+                    postings[trigram].append(number)
+                except KeyError:
+                    postings[trigram] = array("I", (number,))
+
+    def discard(self, *commands: str) -> None:
+        for command in commands:
+            number = self.numbers.pop(command, None)
+            if number is not None:
+                # left in the postings, lookups skip it
+                self.commands[number] = None
+
+    def lookup(self, literals: Iterable[str]) -> Optional[Set[str]]:
+        """
+        Returns the commands that may contain all the literals,
+        or None if they are too short to tell, not ASCII, or too common.
+        """
+        trigrams: Set[str] = set()
+        for literal in literals:
+            if not literal.isascii():
+                return None
+            trigrams |= get_trigrams(literal)
+        if not trigrams:
+            return None
+        postings = sorted(
+            (self.postings.get(trigram, array("I")) for trigram in trigrams), key=len
+        )
+        if len(postings[0]) > max(FEW_COMMANDS, DENSE_SHARE * len(self.numbers)):
+            return None
+        numbers = _intersect(postings)
+        numbers.update(self.unindexed)
+        return {
+            command
+            for command in map(self.commands.__getitem__, numbers)
+            if command is not None
+        }
+
+
+def _intersect(postings: List[array]) -> Set[int]:
+    """
+    Intersects sorted postings, shortest first, until few numbers are left.
+    """
+    numbers = set(postings[0])
+    for posting in postings[1:]:
+        if len(numbers) <= FEW_COMMANDS:
+            break
+        if len(posting) > BISECT_RATIO * len(numbers):
+            numbers = {number for number in numbers if _contains(posting, number)}
+        else:
+            numbers.intersection_update(posting)
+    return numbers
+
+
+def _contains(posting: Sequence[int], number: int) -> bool:
+    idx = bisect_left(posting, number)
+    return idx < len(posting) and posting[idx] == number
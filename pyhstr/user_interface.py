@@ -7,9 +7,11 @@ from typing import (
     Any,
     Dict,
     List,
+    Tuple,
     Union,
 )
 
+from pyhstr.search import Results
 from pyhstr.utilities import View
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -28,10 +30,19 @@ COLORS: Dict[str, int] = {
     "bold-red": 0,
 }
 
+# (x, text, color) segments drawn left to right, later ones on top
+Row = Tuple[Tuple[int, str, int], ...]
+
 PYHSTR_LABEL = (
-    "Type to filter, UP/DOWN move, RET/TAB select, DEL remove, ESC quit, C-f add/rm fav"
+    "Type to filter, UP/DOWN move, RET/TAB select, INS mark, DEL remove, ESC quit, "
+    "C-f add/rm fav"
 )
 PYHSTR_STATUS = "- view:{} (C-/) - regex:{} (C-e) - case:{} (C-t) - page {}/{} -"
+# in place of the page count, which is not known yet
+PYHSTR_LOADING = "- view:{} (C-/) - regex:{} (C-e) - case:{} (C-t) - loading... -"
+# with tracing shown, the last timings come first, in place of the key hints
+PYHSTR_TRACED = "- {} - view:{} - regex:{} - case:{} - {} -"
+REGEX_TOO_SLOW = "Regex too slow, showing the matches found in time. Try another."
 
 PS1 = getattr(sys, "ps1", ">>> ")
 
@@ -40,6 +51,7 @@ DISPLAY: Dict[str, Dict[Union[View, bool], str]] = {
         View.SORTED: "sorted",
         View.FAVORITES: "favorites",
         View.ALL: "history",
+        View.MERGED: "merged",
     },
     "case": {
         True: "sensitive",
@@ -57,10 +69,36 @@ class Direction(Enum):
     NEXT = 1
 
 
+class Layout:
+    """
+    The terminal's size, looked up once and then only when it changes,
+    i.e. on KEY_RESIZE, instead of on every keystroke.
+    """
+
+    def __init__(self) -> None:
+        self.width = 0
+        self.height = 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        # Since curses does not update LINES and COLS on resize,
+        # we need to get get correct terminal size after resize,
+        # which is only possible with shutil.get_terminal_size().
+        self.width, self.height = shutil.get_terminal_size()
+
+    @property
+    def page_size(self) -> int:
+        # the prompt, the label and the status come first
+        return self.height - 3
+
+
 class UserInterface:
     def __init__(self, app: App):
         self.app = app
+        self.layout = Layout()
         self.page = Page(self.app)
+        # what every row of the screen shows, as last drawn
+        self.frame: Dict[int, Row] = {}
 
     def _addstr(self, y_coord: int, x_coord: int, text: str, color_info: int) -> None:
         """
@@ -78,6 +116,39 @@ class UserInterface:
         else:
             self.app.stdscr.addstr(y_coord, x_coord, text, color_info)
 
+    def _draw_row(self, y_coord: int, row: Row) -> None:
+        """
+        Draws the row only if it differs from what the screen already shows
+        there. Every row must cover whatever it replaces, so the screen never
+        needs to be cleared in between frames.
+        """
+        if self.frame.get(y_coord) == row:
+            return
+        for x_coord, text, color_info in row:
+            self._addstr(y_coord, x_coord, text, color_info)
+        self.frame[y_coord] = row
+
+    def clear(self) -> None:
+        """
+        Blanks the screen and forgets the last frame, for when the screen
+        got out of sync with it, e.g. after a resize.
+        """
+        self.app.stdscr.clear()
+        self.frame.clear()
+
+    def resize(self) -> None:
+        """
+        Picks up the new terminal size and redraws everything for it,
+        keeping the same command selected.
+        """
+        selected = (self.page.value - 1) * self.layout.page_size + self.page.selected
+        self.layout.refresh()
+        if self.layout.page_size > 0:
+            self.page.value = selected // self.layout.page_size + 1
+            self.page.selected = selected % self.layout.page_size
+        self.clear()
+        self.populate_screen()
+
     @staticmethod
     def init_color_pairs() -> None:
         mapping: Dict[int, List[int]] = {
@@ -97,79 +168,138 @@ class UserInterface:
                 COLORS[color] = curses.color_pair(idx)
 
     def populate_screen(self) -> None:
+        with self.app.tracer.span("render"):
+            self._populate_screen()
+
+    def _populate_screen(self) -> None:
         status = self._make_status()
         cmds = self.page.get_commands()
+        width = self.layout.width - 1
 
         for cmd_idx, cmd in enumerate(cmds):
-            # print everything first (normal),
-            # then print found matches (in red)
-            # then print favorites (white)
-            # then print selected on top of all that (green)
             try:
-                padded_cmd = cmd.ljust(curses.COLS - 1)
-                self._addstr(cmd_idx + 3, 1, padded_cmd, COLORS["normal"])
-                matched_chars = self.get_matched_chars(cmd)
-
-                if matched_chars:
-                    for char_idx, char in enumerate(cmd):
-                        if char_idx in matched_chars:
-                            self.app.stdscr.attron(COLORS["bold-red"])
-                            self.app.stdscr.addch(cmd_idx + 3, char_idx + 1, char)
-                            self.app.stdscr.attroff(COLORS["bold-red"])
-
-                if cmd in self.app.commands[View.FAVORITES]:
-                    self._addstr(cmd_idx + 3, 1, padded_cmd, COLORS["white"])
-
-                if cmd_idx == self.app.user_interface.page.selected:
-                    self._addstr(cmd_idx + 3, 1, padded_cmd, COLORS["highlighted-green"])
+                self._draw_row(cmd_idx + 3, self._make_command_row(cmd_idx, cmd, width))
             except curses.error:
                 pass
 
-        self._addstr(1, 1, PYHSTR_LABEL, COLORS["normal"])
-        self._addstr(2, 1, status, COLORS["highlighted-white"])
-        self._addstr(0, 1, PS1 + self.app.search_string, COLORS["normal"])
+        # blank the rows left over from a longer page
+        blank: Row = ((1, "".ljust(width), COLORS["normal"]),)
+        for y_coord in sorted(self.frame):
+            if y_coord >= len(cmds) + 3:
+                try:
+                    self._draw_row(y_coord, blank)
+                except curses.error:
+                    pass
+
+        prompt = PS1 + self.app.search_string
+        if self._is_too_slow():
+            self._draw_row(1, self._make_message_row(REGEX_TOO_SLOW))
+        else:
+            label = PYHSTR_LABEL[:width].ljust(width)
+            self._draw_row(1, ((1, label, COLORS["normal"]),))
+        self._draw_row(2, ((1, status, COLORS["highlighted-white"]),))
+        self._draw_row(0, ((1, prompt.ljust(width), COLORS["normal"]),))
+        self.app.stdscr.move(0, 1 + len(prompt))
+
+        self.app.stdscr.noutrefresh()
+        curses.doupdate()
+
+    def _make_command_row(self, cmd_idx: int, cmd: str, width: int) -> Row:
+        """
+        The selection, marked commands and favorites cover the whole row,
+        otherwise the found matches are shown in red.
+        """
+        # in the merged view, where the command comes from goes on the right
+        tag = self.app.provenance.get(cmd) if self.app.view == View.MERGED else None
+        tagged: Row = ()
+        if tag is not None and len(tag) + 3 < width:
+            width -= len(tag) + 3
+            tagged = ((width + 1, f" [{tag}]", COLORS["normal"]),)
+        padded_cmd = cmd[:width].ljust(width)
+        if cmd_idx == self.page.selected:
+            return ((1, padded_cmd, COLORS["highlighted-green"]),) + tagged
+        if cmd in self.app.marked:
+            return ((1, padded_cmd, COLORS["highlighted-red"]),) + tagged
+        if cmd in self.app.favorites:
+            return ((1, padded_cmd, COLORS["white"]),) + tagged
+        return (
+            ((1, padded_cmd, COLORS["normal"]),)
+            + tuple(
+                (start + 1, cmd[start : min(end, width)], COLORS["bold-red"])
+                for start, end in self.get_matched_chars(cmd)
+                if start < width
+            )
+            + tagged
+        )
 
     def _make_status(self) -> str:
         current_page = self.app.user_interface.page.value
         total_pages = self.total_pages()
-        status = PYHSTR_STATUS.format(
+        regex_mode = DISPLAY["regex_mode"][self.app.regex_mode]
+        settings = (
             DISPLAY["view"][self.app.view],
-            DISPLAY["regex_mode"][self.app.regex_mode],
+            "fuzzy" if self.app.fuzzy_mode else regex_mode,
             DISPLAY["case"][self.app.case_sensitivity],
+        )
+        pages = (
             current_page if total_pages > 0 else 0,
-            total_pages,
-        ).ljust(curses.COLS - 1)
-        return status
+            f"≥{total_pages}" if self.is_scanning() else total_pages,
+        )
+        if self.app.tracer.overlay:
+            status = PYHSTR_TRACED.format(
+                self.app.tracer.get_overlay(),
+                *settings,
+                "loading..."
+                if self.app.is_loading()
+                else f"page {pages[0]}/{pages[1]}",
+            )
+        elif self.app.is_loading():
+            status = PYHSTR_LOADING.format(*settings)
+        else:
+            status = PYHSTR_STATUS.format(*settings, *pages)
+        # cut off rather than wrap onto the first command
+        return status[: self.layout.width - 1].ljust(self.layout.width - 1)
 
-    def prompt_for_deletion(self, command: str) -> None:
-        prompt = f"Do you want to delete all occurences of {command}? y/n"
-        self._addstr(1, 0, "".ljust(curses.COLS), COLORS["normal"])
-        self._addstr(1, 1, prompt, COLORS["highlighted-red"])
+    def _make_message_row(self, prompt: str) -> Row:
+        return (
+            (0, "".ljust(self.layout.width), COLORS["normal"]),
+            (1, prompt, COLORS["highlighted-red"]),
+        )
+
+    def prompt_for_deletion(self, *commands: str) -> None:
+        if len(commands) == 1:
+            prompt = f"Do you want to delete all occurences of {commands[0]}? y/n"
+        else:
+            count = len(commands)
+            prompt = f"Do you want to delete all occurences of {count} marked commands? y/n"
+        self._draw_row(1, self._make_message_row(prompt))
 
     def show_regex_error(self) -> None:
         prompt = "Invalid regex. Try again."
-        self._addstr(1, 0, "".ljust(curses.COLS), COLORS["normal"])
-        self._addstr(1, 1, prompt, COLORS["highlighted-red"])
-        self._addstr(0, 1, PS1 + self.app.search_string, COLORS["normal"])
+        self._draw_row(1, self._make_message_row(prompt))
+        self.app.stdscr.move(0, 1 + len(PS1 + self.app.search_string))
 
     def total_pages(self) -> int:
-        # Since curses does not update LINES and COLS on resize,
-        # we need to get get correct terminal size after resize,
-        # which is only possible with shutil.get_terminal_size().
-        _, y = shutil.get_terminal_size()
-        return len(range(0, len(self.app.commands[self.app.view]), y - 3))
+        commands = self.app.commands[self.app.view]
+        # while the search is still running, count the pages found so far
+        found = commands.found if isinstance(commands, Results) else len(commands)
+        return len(range(0, found, self.layout.page_size))
 
-    def get_matched_chars(self, command: str) -> List[int]:
-        regex = self.app.create_search_regex()
-        return (
-            []
-            if regex is None
-            else [
-                cmd_idx
-                for m in regex.finditer(command)
-                for cmd_idx in range(m.start(), m.end())
-            ]
-        )
+    def is_scanning(self) -> bool:
+        """
+        Tells whether the results shown are still being found,
+        see App.advance_scan().
+        """
+        commands = self.app.commands[self.app.view]
+        return isinstance(commands, Results) and not commands.done
+
+    def _is_too_slow(self) -> bool:
+        commands = self.app.commands[self.app.view]
+        return isinstance(commands, Results) and commands.too_slow
+
+    def get_matched_chars(self, command: str) -> List[Tuple[int, int]]:
+        self.app.create_search_regex()
+        return self.app.query.get_spans(command)
 
 
 class Page:
@@ -206,22 +336,30 @@ class Page:
 
         ... where -1+1 happens to cancel itself.
         """
+        commands = self.app.commands[self.app.view]
+        if isinstance(commands, Results):
+            # make sure the page turned to has been searched
+            if direction == Direction.NEXT:
+                page_size = self.app.user_interface.layout.page_size
+                commands.fill(self.value * page_size + 1)
+            elif self.value == 1:
+                commands.fill()
         total_pages = self.app.user_interface.total_pages()
-        self.app.stdscr.clear()
+        if not total_pages:
+            # nothing matched, there is no page to turn to
+            return
         self.value = ((self.value - 1 + direction.value) % total_pages) + 1
 
-
     def get_size(self) -> int:
         return len(self.get_commands())
 
     def get_commands(self) -> List[str]:
-        # Since curses does not update LINES and COLS on resize,
-        # we need to get get correct terminal size after resize,
-        # which is only possible with shutil.get_terminal_size().
-        _, y = shutil.get_terminal_size()
-        return self.app.commands[self.app.view][
-            (self.value - 1) * (y - 3) : self.value * (y - 3)
-        ]
+        page_size = self.app.user_interface.layout.page_size
+        return list(
+            self.app.commands[self.app.view][
+                (self.value - 1) * page_size : self.value * page_size
+            ]
+        )
 
     def move_selected(self, direction: Direction) -> None:
         page_size = self.get_size()
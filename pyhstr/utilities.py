@@ -1,23 +1,59 @@
-from collections import Counter, OrderedDict
+import os
+import shutil
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
 from enum import Enum
 from fcntl import ioctl
 from termios import TIOCSTI
 from pathlib import Path
-from typing import List, Optional
-
-try:
-    import IPython
-except ModuleNotFoundError:  # pragma: no cover
-    IPython = None
-
-try:
-    from bpython.config import (
-        Struct,
-        get_config_home,
-        loadini,
-    )
-except ModuleNotFoundError:  # pragma: no cover
-    Struct = get_config_home = loadini = None
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Tuple
+
+from pyhstr.ranking import Ranking, decay
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sqlite3 import Connection
+
+# how many commands a page read from IPython's history database holds
+IPYTHON_PAGE_SIZE = 1000
+
+# Rank inside SQLite, the same way Ranking does: highest score first, then
+# the most recent last occurrence. IPython itself orders by this position.
+# Each run scores by how long before the latest session its session started,
+# see register_decay, a run in a session without a start counts as the latest.
+# The score, count and position come along for Ranking.extend().
+IPYTHON_SORTED = """
+    SELECT
+        source_raw,
+        SUM(IFNULL(weight, 1)) AS score,
+        COUNT(*),
+        MAX(session * 128 * 1024 + line) AS position
+    FROM history LEFT JOIN (
+        SELECT session, pyhstr_decay(
+            strftime('%s', start), (SELECT strftime('%s', MAX(start)) FROM sessions)
+        ) AS weight FROM sessions
+    ) USING (session)
+    GROUP BY source_raw
+    ORDER BY score DESC, position DESC
+"""
+# when the latest session started, which the scores above are as of
+IPYTHON_LATEST = "SELECT strftime('%s', MAX(start)) FROM sessions"
+IPYTHON_UNIQUE = """
+    SELECT source_raw FROM history GROUP BY source_raw
+    ORDER BY MIN(session * 128 * 1024 + line)
+"""
+
+# lines a session can have before the positions above overlap
+IPYTHON_SESSION_SIZE = 128 * 1024
+# where the history ends, and what was added past a position, in order,
+# looking up the session in the primary key, with when the session started
+IPYTHON_LAST = "SELECT IFNULL(MAX(session * 128 * 1024 + line), 0) FROM history"
+IPYTHON_SINCE = """
+    SELECT source_raw, strftime('%s', start), session * 128 * 1024 + line
+    FROM history LEFT JOIN sessions USING (session)
+    WHERE session >= ? AND session * 128 * 1024 + line > ?
+    ORDER BY session, line
+"""
 
 
 class Shell(Enum):
@@ -30,6 +66,7 @@ class View(Enum):
     SORTED = 0
     FAVORITES = 1
     ALL = 2
+    MERGED = 3
 
 
 def detect_shell() -> Shell:
@@ -41,7 +78,10 @@ def detect_shell() -> Shell:
 
 
 def _is_ipython() -> bool:
-    return IPython is not None and IPython.get_ipython() is not None
+    # IPython can only be running if it has been imported already,
+    # so there is no need to pay for importing it here
+    ipython = sys.modules.get("IPython")
+    return ipython is not None and ipython.get_ipython() is not None
 
 
 def _is_bpython() -> bool:
@@ -49,43 +89,92 @@ def _is_bpython() -> bool:
 
 
 def sort(thing: List[str]) -> List[str]:
-    return remove_duplicates(_sort_by_freq(_sort_by_pos(thing)))
+    return Ranking(thing).sorted()
 
 
 def remove_duplicates(thing: List[str]) -> List[str]:
     return list(OrderedDict.fromkeys(thing))
 
 
-def _sort_by_freq(thing: List[str]) -> List[str]:
-    return sorted(
-        thing,
-        key=lambda item: Counter(thing)[item],
-        reverse=True,
-    )
+def echo(command: str) -> None:
+    for byte in command.encode("utf-8"):
+        ioctl(0, TIOCSTI, bytes([byte]))
 
 
-def _sort_by_pos(thing: List[str]) -> List[str]:
-    return sorted(
-        thing,
-        key=lambda item: {x: i for i, x in enumerate(thing)}[item],
-        reverse=True,
-    )
+def get_ipython_db() -> "Connection":
+    import IPython  # pylint: disable=import-outside-toplevel
 
+    return IPython.get_ipython().history_manager.db
 
-def echo(command: str) -> None:
-    for byte in command.encode("utf-8"):
-        ioctl(0, TIOCSTI, bytes([byte]))
 
+def connect_ipython_db() -> Optional["Connection"]:
+    """
+    Opens a connection to IPython's history database that any thread can use,
+    which IPython's own cannot, or returns None if the history is only
+    kept in memory, where IPython's own connection is the only way to it.
+    """
+    # pylint: disable=import-outside-toplevel
+    import sqlite3
 
-def get_ipython_history() -> List[str]:
-    return [
-        entry
-        for session_number, line_number, entry
-        in IPython.get_ipython().history_manager.search()
-    ]
+    import IPython
+
+    hist_file = str(IPython.get_ipython().history_manager.hist_file)
+    if hist_file == ":memory:":
+        return None
+    return sqlite3.connect(hist_file, check_same_thread=False)
+
+
+def index_ipython_history(db: "Connection") -> None:
+    """
+    Indexes the commands, which lets SQLite group them without sorting the
+    whole table first, and makes deleting a command a lookup instead of a scan.
+    """
+    import sqlite3  # pylint: disable=import-outside-toplevel
+
+    try:
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS pyhstr_source_raw ON history (source_raw)"
+        )
+    except sqlite3.OperationalError:
+        # e.g. the database is locked, it only gets slower without the index
+        pass
+
+
+def register_decay(db: "Connection") -> None:
+    """
+    Adds the function IPYTHON_SORTED weighs the runs of a command with,
+    called once per session rather than once per command.
+    """
+
+    def pyhstr_decay(start: Optional[str], latest: Optional[str]) -> float:
+        if start is None or latest is None:
+            return 1.0
+        return decay(float(start), float(latest))
+
+    db.create_function("pyhstr_decay", 2, pyhstr_decay)
+
+
+def iter_ipython_history(
+    db: "Connection", query: str, page_size: int = IPYTHON_PAGE_SIZE
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Yields the rows selected by `query`, the command first, one page at a time,
+    so the first page is available before the rest is read.
+    """
+    cursor = db.execute(query)
+    while True:
+        page = cursor.fetchmany(page_size)
+        if not page:
+            return
+        yield page
 
 
 def get_bpython_history_path() -> Optional[Path]:
+    try:
+        # pylint: disable=import-outside-toplevel
+        from bpython.config import Struct, get_config_home, loadini
+    except ModuleNotFoundError:
+        return None
     try:
         config = Struct()
         loadini(config, Path(get_config_home()).expanduser() / "config")
@@ -94,11 +183,30 @@ def get_bpython_history_path() -> Optional[Path]:
         return None
 
 
+@contextmanager
+def replacing(path: Path) -> Iterator[Path]:
+    """
+    Yields a temporary path next to `path`, which is renamed over `path`
+    once the block succeeds, so readers never see a half-written file.
+    A symlink is followed, so it stays one, and the mode is kept.
+    """
+    path = path.resolve()
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
 def write(path: Optional[Path], thing: List[str]) -> None:
     assert path is not None
     if not path.parent.exists():
         path.parent.mkdir(exist_ok=True)
-    with open(path, "w") as f:
+    with replacing(path) as tmp, open(tmp, "w") as f:
         for thingy in thing:
             print(thingy, file=f)
 
@@ -4,15 +4,19 @@
 # pylint: disable=unused-argument
 
 from pathlib import Path
+import curses
 import os
 import random
 import shutil
+import sqlite3
 import string
+import sys
 import pytest
 
 from pyhstr import (
     __main__,
     application,
+    sources,
     utilities,
     user_interface,
 )
@@ -29,6 +33,12 @@ class FakeReadline:
     def remove_history_item(self, i):
         self.history.pop(i)
 
+    def clear_history(self):
+        self.history = []
+
+    def add_history(self, item):
+        self.history.append(item)
+
     def write_history_file(self, path):
         write(Path(path), self.history)
 
@@ -47,6 +57,13 @@ class FakeCurses:
 
     A_BOLD = 1 << (13 + 8)
 
+    KEY_UP = curses.KEY_UP
+    KEY_DOWN = curses.KEY_DOWN
+    KEY_PPAGE = curses.KEY_PPAGE
+    KEY_NPAGE = curses.KEY_NPAGE
+    KEY_BACKSPACE = curses.KEY_BACKSPACE
+    KEY_RESIZE = curses.KEY_RESIZE
+
     class error(Exception):
         pass
 
@@ -59,11 +76,16 @@ class FakeCurses:
     def color_pair(self, idx):
         return idx << (0 + 8)
 
+    def doupdate(self):
+        pass
+
 
 class FakeStdscr:
     def __init__(self):
         self.addstred = []
         self.addched = []
+        # typed by get_wch, then escape, which quits
+        self.keys = []
 
     def addstr(self, *args):
         self.addstred.append(args)
@@ -89,9 +111,18 @@ class FakeStdscr:
     def refresh(self):
         pass
 
+    def noutrefresh(self):
+        pass
+
+    def move(self, *args):
+        pass
+
     def getch(self):
         pass
 
+    def get_wch(self):
+        return self.keys.pop(0) if self.keys else "\x1b"
+
     def nodelay(self, *args):
         pass
 
@@ -109,9 +140,16 @@ def fake_get_terminal_size(*args, **kwargs):
     return FakeCurses.COLS, FakeCurses.LINES
 
 
+def install_fake_readline(monkeypatch):
+    fake_rl = FakeReadline()
+    monkeypatch.setattr(application, "get_readline", lambda: fake_rl)
+    monkeypatch.setattr(sources, "get_readline", lambda: fake_rl)
+    return fake_rl
+
+
 @pytest.fixture
 def fake_readline(monkeypatch):
-    monkeypatch.setattr(application, "readline", FakeReadline())
+    return install_fake_readline(monkeypatch)
 
 
 @pytest.fixture
@@ -152,26 +190,77 @@ def fake_termios(monkeypatch):
     monkeypatch.setattr(utilities, "TIOCSTI", FakeTermios().TIOCSTI)
 
 
-def fake_get_ipython_history():
-    return read(application.SHELLS[Shell.IPYTHON]["hist"])
+def copy_favorites(shell, tmp_path):
+    path = tmp_path / f"{shell}_favorites"
+    shutil.copyfile(f"tests/favorites/fake_{shell}_favorites", path)
+    return path
+
+
+def make_ipython_db(sessions, starts=None, path=":memory:"):
+    db = sqlite3.connect(str(path))
+    db.execute(
+        "CREATE TABLE sessions (session integer primary key autoincrement, "
+        "start timestamp, end timestamp, num_cmds integer, remark text)"
+    )
+    db.execute(
+        "CREATE TABLE history (session integer, line integer, "
+        "source text, source_raw text, PRIMARY KEY (session, line))"
+    )
+    if starts is None:
+        starts = ["2020-01-01 00:00:00.000000"] * len(sessions)
+    db.executemany(
+        "INSERT INTO sessions (session, start) VALUES (?, ?)",
+        list(enumerate(starts, 1)),
+    )
+    db.executemany(
+        "INSERT INTO history VALUES (?, ?, ?, ?)",
+        [
+            (session, line, source, source)
+            for session, commands in enumerate(sessions, 1)
+            for line, source in enumerate(commands, 1)
+        ],
+    )
+    db.commit()
+    return db
+
+
+class FakeHistoryManager:
+    def __init__(self, hist_file):
+        self.hist_file = hist_file
+        # like IPython's, only usable in the thread that opened it
+        self.db = sqlite3.connect(str(hist_file))
+
+
+class FakeIPython:
+    def __init__(self, hist_file):
+        self.history_manager = FakeHistoryManager(hist_file)
+
+    def get_ipython(self):
+        return self
 
 
 @pytest.fixture
-def fake_ipython(monkeypatch):
+def fake_ipython(monkeypatch, tmp_path):
     monkeypatch.setattr(application, "SHELL", Shell.IPYTHON)
-    monkeypatch.setattr(application, "get_ipython_history", fake_get_ipython_history)
+    hist_file = tmp_path / "history.sqlite"
+    make_ipython_db([read("tests/history/fake_ipython_history")], path=hist_file).close()
+    ipython = FakeIPython(hist_file)
+    monkeypatch.setitem(sys.modules, "IPython", ipython)
     monkeypatch.setitem(
         application.SHELLS,
         Shell.IPYTHON,
         {
             "hist": Path("tests/history/fake_ipython_history"),
-            "fav": Path("tests/favorites/fake_ipython_favorites"),
+            "fav": copy_favorites("ipython", tmp_path),
+            "index": None,
         },
     )
+    yield ipython
+    ipython.history_manager.db.close()
 
 
 @pytest.fixture
-def fake_bpython(monkeypatch):
+def fake_bpython(monkeypatch, tmp_path):
     monkeypatch.setattr(application, "SHELL", Shell.BPYTHON)
     monkeypatch.setattr(help, "__module__", "bpython")
     monkeypatch.setitem(
@@ -179,20 +268,24 @@ def fake_bpython(monkeypatch):
         Shell.BPYTHON,
         {
             "hist": Path("tests/history/fake_bpython_history"),
-            "fav": Path("tests/favorites/fake_bpython_favorites"),
+            "fav": copy_favorites("bpython", tmp_path),
+            "index": tmp_path / "bpython_index",
         },
     )
 
 
 @pytest.fixture
-def fake_standard(monkeypatch):
+def fake_standard(monkeypatch, tmp_path):
     monkeypatch.setattr(application, "SHELL", Shell.STANDARD)
+    # the standard shell's history is read from readline
+    install_fake_readline(monkeypatch)
     monkeypatch.setitem(
         application.SHELLS,
         Shell.STANDARD,
         {
             "hist": Path("tests/history/fake_python_history"),
-            "fav": Path("tests/favorites/fake_python_favorites"),
+            "fav": copy_favorites("python", tmp_path),
+            "index": None,
         },
     )
 
@@ -4,15 +4,23 @@
 # pylint: disable=too-many-arguments
 
 
+import curses
 import os
 import shutil
+import time
+from types import SimpleNamespace
 import pytest
-from pyhstr import application
+from pyhstr import __main__, application, user_interface
 from pyhstr.application import App
+from pyhstr.favorites import Favorites
+from pyhstr.search import Results
+from pyhstr.trigram import TrigramIndex
 from pyhstr.utilities import (
     Shell,
     View,
     read,
+    remove_duplicates,
+    sort,
 )
 
 from tests.fixtures import (
@@ -38,6 +46,62 @@ def test_delete_python_history(
     shutil.move(tmp_path / "history", "tests/history/fake_python_history")
 
 
+@pytest.mark.python
+def test_delete_python_history_batch(fake_stdscr, fake_standard, fake_readline, tmp_path):
+    history = tmp_path / "history"
+    shutil.copyfile("tests/history/fake_python_history", history)
+    application.SHELLS[Shell.STANDARD]["hist"] = history
+    commands = ["1 + 1 == 2", 'ord("r")', "print(sys.argv)"]
+    App(fake_stdscr).delete_python_history(*commands)
+    assert read(history) == [
+        cmd for cmd in read("tests/history/fake_python_history") if cmd not in commands
+    ]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.all
+def test_delete_from_pyhstr(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.commands[View.ALL] = app.to_restore[View.ALL] = ["a", "b", "b", "c", "b"]
+    app.search_string = "sys"
+    app.search()
+    deleted = app.commands[View.SORTED][:2]
+    app.delete_from_pyhstr("b", *deleted)
+    assert app.commands[View.ALL] == ["a", "c"]
+    assert app.commands[View.ALL] is app.to_restore[View.ALL]
+    assert app.commands[View.FAVORITES] is app.to_restore[View.FAVORITES]
+    for view in (app.commands, app.to_restore):
+        assert not set(deleted) & set(view[View.SORTED])
+
+
+@pytest.mark.all
+def test_delete_from_pyhstr_lazily(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.wait_until_loaded()
+    # scanned, not looked up in the index of the history
+    app.trigrams = None
+    app.view = View.ALL
+    app.to_restore[View.ALL] = [f"print({i})" for i in range(10_000)]
+    app.search_string = "print"
+    app.search()
+    shown = app.commands[View.ALL]
+    assert shown[:3] == ["print(0)", "print(1)", "print(2)"]
+    app.delete_from_pyhstr("print(1)", "print(9999)")
+    assert isinstance(app.commands[View.ALL], Results)
+    assert not shown.done
+    assert app.commands[View.ALL][:2] == ["print(0)", "print(2)"]
+    assert len(app.commands[View.ALL]) == 9998
+
+
+@pytest.mark.python
+def test_delete_python_history_by_index(fake_stdscr, fake_standard, fake_readline, tmp_path):
+    application.SHELLS[Shell.STANDARD]["hist"] = tmp_path / "history"
+    fake_readline.history = ["a", "b", "c", "b", "d", "a"]
+    App(fake_stdscr).delete_python_history("a", "b")
+    assert fake_readline.history == ["c", "d"]
+    assert read(tmp_path / "history") == ["c", "d"]
+
+
 @pytest.mark.all
 def test_create_search_regex_none(fake_stdscr):
     app = App(fake_stdscr)
@@ -101,10 +165,332 @@ def test_search(
     assert all(x in expected for x in app.commands[app.view])
 
 
-@pytest.mark.parametrize("shell, fixture", params)
-def test_get_history(shell, fixture, fake_stdscr):
+@pytest.mark.all
+def test_search_narrows_previous_result(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    for char in "print(":
+        app.search_string += char
+        app.search()
+    assert len(app.search_results) == len("print(")
+    assert all("print(" in cmd for cmd in app.commands[app.view])
+
+    narrowed = app.commands[app.view]
+    app.search_string += "s"
+    app.search()
+    app.search_string = app.search_string[:-1]
+    app.search()
+    assert app.commands[app.view] is narrowed
+
+    app.toggle_case()
+    app.search()
+    assert len(app.search_results) == 1
+
+
+@pytest.mark.all
+def test_search_looks_up_trigrams(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.trigrams = TrigramIndex(["print(sys.argv)", "ord('p')"])
+    app.search_string = "print"
+    app.search()
+    assert list(app.commands[app.view]) == ["print(sys.argv)"]
+
+
+@pytest.mark.all
+def test_search_keeps_order_of_view(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.to_restore[app.view][:] = ["print(2)", "import sys", "print(1)"]
+    app.trigrams = TrigramIndex(app.to_restore[app.view][::-1])
+    app.search_string = "print"
+    app.search()
+    assert list(app.commands[app.view]) == ["print(2)", "print(1)"]
+
+
+@pytest.mark.all
+def test_search_narrows_prefix(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.to_restore[app.view][:] = ["print(2)", "import sys", "print(1)"]
+    # more candidates than matches for "print"
+    app.trigrams = TrigramIndex([f"print({idx})" for idx in range(10)])
+    app.search_string = "print"
+    app.search()
+    # filtered from the matches for "print", not looked up in the view
+    app.to_restore[app.view] = []
+    app.ranks.clear()
+    app.search_string = "print("
+    app.search()
+    assert list(app.commands[app.view]) == ["print(2)", "print(1)"]
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "search_string, command", [["οδοσ", 'print("ΟΔΟΣ")'], ["sys", '"ſys"']]
+)
+def test_search_looks_up_non_ascii(
+    search_string, command, fake_stdscr, fake_curses, fake_standard
+):
+    app = App(fake_stdscr)
+    app.to_restore[app.view].append(command)
+    app.trigrams = TrigramIndex(app.to_restore[app.view])
+    app.search_string = search_string
+    app.search()
+    assert command in app.commands[app.view]
+
+
+@pytest.mark.all
+def test_delete_waits_for_index(
+    monkeypatch, fake_stdscr, fake_curses, fake_standard, tmp_path
+):
+    history = tmp_path / "history"
+    shutil.copyfile("tests/history/fake_python_history", history)
+    monkeypatch.setitem(application.SHELLS[Shell.STANDARD], "hist", history)
+    index = App._index  # pylint: disable=protected-access
+
+    def slow_index(self):
+        time.sleep(0.1)
+        index(self)
+
+    monkeypatch.setattr(App, "_index", slow_index)
+    app = App(fake_stdscr, background=True)
+    app.wait_until_loaded()
+    app.delete_from_history("print(sys.argv)")
+    assert app.trigrams.lookup(["sys.argv"]) == set()
+    app.wait_until_loaded()
+
+
+@pytest.mark.python
+def test_delete_in_the_background(
+    monkeypatch, fake_stdscr, fake_standard, fake_readline, tmp_path
+):
+    monkeypatch.setitem(application.SHELLS[Shell.STANDARD], "hist", tmp_path / "history")
+    monkeypatch.setattr(application, "SESSION", None)
+    delete = App.delete_python_history
+
+    def slow_delete(self, *commands):
+        time.sleep(0.1)
+        delete(self, *commands)
+
+    monkeypatch.setattr(App, "delete_python_history", slow_delete)
+    app = App(fake_stdscr, background=True)
+    app.wait_until_loaded()
+    app.delete_from_history("print(sys.argv)")
+    assert "print(sys.argv)" not in app.commands[View.SORTED]
+    assert "print(sys.argv)" in fake_readline.history
+    # the shell only goes on once its history is rewritten
+    application.suspend(app)
+    assert "print(sys.argv)" not in fake_readline.history
+    assert "print(sys.argv)" not in read(tmp_path / "history")
+
+
+@pytest.mark.all
+def test_search_scans_in_the_background(fake_stdscr, fake_curses, fake_standard):
     app = App(fake_stdscr)
-    assert app.get_history() == read(f"tests/history/fake_{shell.value}_history")
+    app.to_restore[app.view] = [f"print({i})" for i in range(3 * 5000)]
+    app.trigrams = TrigramIndex(app.to_restore[app.view])
+    app.search_string = "print"
+    app.search()
+    assert app.user_interface.is_scanning()
+    assert app.commands[app.view].found < 5000
+    while app.user_interface.is_scanning():
+        app.advance_scan()
+    assert len(app.commands[app.view]) == 3 * 5000
+
+
+@pytest.mark.all
+def test_search_soon(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    shown = app.commands[app.view]
+    app.search_string = "print"
+    app.search_soon()
+    assert app.scheduled.is_pending()
+    assert 0 < app.scheduled.get_delay() <= 31
+    app.advance_search()
+    assert app.commands[app.view] is shown
+
+    monkeypatch.setattr(application, "SEARCH_DEBOUNCE", 0)
+    app.search_string = "print(s"
+    app.search_soon()
+    app.advance_search()
+    assert not app.scheduled.is_pending()
+    assert list(app.commands[app.view]) == [
+        "print(sys.executable)",
+        "print(sys.argv)",
+    ]
+
+
+@pytest.mark.all
+def test_fuzzy_search_soon(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    monkeypatch.setattr(application, "SEARCH_DEBOUNCE", 0)
+    app = App(fake_stdscr)
+    app.to_restore[app.view] = [f"print({i})" for i in range(3000)]
+    shown = app.commands[app.view]
+    app.fuzzy_mode = True
+    app.search_string = "prt"
+    app.search_soon()
+    # ranked a chunk at a time, nothing shown until all are
+    app.advance_search()
+    assert app.scheduled.ranked is not None
+    assert app.commands[app.view] is shown
+    while app.scheduled.is_pending():
+        app.advance_search()
+    assert app.commands[app.view][:2] == ["print(0)", "print(1)"]
+
+    app.search_string = "prt("
+    app.search_soon()
+    app.finish_search()
+    assert len(app.commands[app.view]) == 500
+
+
+@pytest.mark.all
+def test_finish_search(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.search_string = "tau"
+    app.search_soon()
+    app.finish_search()
+    assert not app.scheduled.is_pending()
+    assert list(app.commands[app.view]) == ["from math import tau", "tau == 2 * pi"]
+
+
+@pytest.mark.all
+def test_load_ipython(fake_stdscr, fake_ipython):
+    app = App(fake_stdscr)
+    history = read("tests/history/fake_ipython_history")
+    assert app.commands[View.SORTED] == sort(history)
+    assert app.commands[View.ALL] == remove_duplicates(history)
+
+
+@pytest.mark.all
+def test_load_ipython_in_background(fake_stdscr, fake_curses, fake_ipython):
+    # IPython's connection was opened in this thread, the loader cannot use it
+    app = App(fake_stdscr, background=True)
+    app.wait_until_loaded()
+    history = read("tests/history/fake_ipython_history")
+    assert app.commands[View.SORTED] == sort(history)
+    app.delete_from_history(history[0])
+    app.reopen(fake_stdscr)
+    app.wait_until_loaded()
+    assert history[0] not in app.commands[View.ALL]
+
+
+@pytest.mark.all
+def test_load_in_background(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr, background=True)
+    app.search_string = "print"
+    app.search()
+    app.loader.join()
+    assert not app.is_loading()
+    assert app.finished_loading()
+    assert not app.finished_loading()
+    history = read("tests/history/fake_python_history")
+    assert list(app.commands[View.SORTED]) == [
+        cmd for cmd in sort(history) if "print" in cmd
+    ]
+    assert app.to_restore[View.ALL] == remove_duplicates(history)
+
+
+@pytest.mark.all
+def test_load_error_raised_in_main_thread(
+    monkeypatch, fake_stdscr, fake_curses, fake_standard
+):
+    def get_ranking(self):
+        raise PermissionError
+
+    monkeypatch.setattr(App, "_get_ranking", get_ranking)
+    app = App(fake_stdscr, background=True)
+    with pytest.raises(PermissionError):
+        app.wait_until_loaded()
+    assert app.load_error is None
+
+
+def run_main(monkeypatch, stdscr, keys):
+    """
+    Runs hh with the keys typed, returning what it put on the next prompt.
+    """
+    injected = []
+    output = SimpleNamespace(
+        inject=lambda command, run=False: injected.append((command, run))
+    )
+    monkeypatch.setattr(application, "get_output", lambda shell: output)
+    monkeypatch.setattr(application, "SESSION", None)
+    # main sets up the colors
+    monkeypatch.setattr(user_interface, "COLORS", dict(user_interface.COLORS))
+    stdscr.keys = keys
+    __main__.main(stdscr)
+    return injected
+
+
+@pytest.mark.all
+def test_enter_while_loading(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    get_ranking = App._get_ranking  # pylint: disable=protected-access
+
+    def slow_get_ranking(self):
+        # still loading by the time enter is pressed
+        time.sleep(0.1)
+        return get_ranking(self)
+
+    monkeypatch.setattr(App, "_get_ranking", slow_get_ranking)
+    injected = run_main(monkeypatch, fake_stdscr, [__main__.ENTER])
+    history = read("tests/history/fake_python_history")
+    assert injected == [(sort(history)[0], True)]
+
+
+@pytest.mark.all
+def test_delete_marked(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    deleted = []
+    monkeypatch.setattr(App, "delete_from_history", lambda self, *cmds: deleted.append(cmds))
+    monkeypatch.setattr(fake_stdscr, "getch", lambda: ord("y"))
+    ins, down, up = __main__.INS, curses.KEY_DOWN, curses.KEY_UP
+    keys = [ins, down, ins, ins, up, ins, __main__.DEL]
+    run_main(monkeypatch, fake_stdscr, keys)
+    history = sort(read("tests/history/fake_python_history"))
+    # the fourth was marked and unmarked again, the rest went at once
+    assert deleted == [(history[0], history[2])]
+
+
+@pytest.mark.all
+def test_toggle_mark(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.toggle_mark("4 / 2")
+    app.toggle_mark("2 ** 10")
+    app.toggle_mark("4 / 2")
+    assert list(app.marked) == ["2 ** 10"]
+
+    monkeypatch.setattr(user_interface, "COLORS", dict(user_interface.COLORS))
+    app.user_interface.init_color_pairs()
+    marked = app.commands[app.view][1]
+    app.toggle_mark(marked)
+    app.user_interface.populate_screen()
+    red = user_interface.COLORS["highlighted-red"]
+    assert (4, 1, marked.ljust(79), red) in fake_stdscr.addstred
+
+
+@pytest.mark.all
+def test_enter_without_matches(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    keys = [*"spam and eggs", __main__.ENTER]
+    assert not run_main(monkeypatch, fake_stdscr, keys)
+
+
+@pytest.mark.all
+def test_toggle_regex_mode_cycles(fake_stdscr):
+    app = App(fake_stdscr)
+    modes = []
+    for _ in range(3):
+        app.toggle_regex_mode()
+        modes.append((app.regex_mode, app.fuzzy_mode))
+    assert modes == [(True, False), (False, True), (False, False)]
+
+
+@pytest.mark.all
+def test_fuzzy_search(fake_stdscr, fake_curses, fake_standard):
+    app = App(fake_stdscr)
+    app.fuzzy_mode = True
+    app.search_string = "prsa"
+    app.search()
+    assert app.commands[app.view][0] == "print(sys.argv)"
+    assert app.user_interface.get_matched_chars("print(sys.argv)") == [
+        (0, 2),
+        (6, 7),
+        (10, 11),
+    ]
 
 
 @pytest.mark.all
@@ -131,21 +517,193 @@ def test_toggle_case(case, fake_stdscr):
     [
         [View.SORTED, View.FAVORITES],
         [View.FAVORITES, View.ALL],
-        [View.ALL, View.SORTED],
+        [View.ALL, View.MERGED],
+        [View.MERGED, View.SORTED],
     ],
 )
 def test_toggle_view(before, expected, fake_stdscr):
     app = App(fake_stdscr)
+    app.merged = True
     app.view = before
     app.toggle_view()
     assert app.view == expected
 
 
+@pytest.mark.all
+def test_merged_view(monkeypatch, tmp_path, fake_stdscr, fake_curses, fake_standard):
+    extra = tmp_path / "host" / "history"
+    extra.parent.mkdir()
+    extra.write_text("print('elsewhere')\nprint(sys.argv)\n")
+    (tmp_path / "histories").write_text(f"{extra}\n")
+    monkeypatch.setattr(application, "HISTORIES", tmp_path / "histories")
+    for shell in (Shell.IPYTHON, Shell.BPYTHON):
+        monkeypatch.setitem(application.SHELLS[shell], "hist", tmp_path / "nope")
+
+    app = App(fake_stdscr)
+    app.view = View.ALL
+    app.toggle_view()
+    assert app.view == View.MERGED
+    history = read("tests/history/fake_python_history")
+    assert set(app.commands[View.MERGED]) == set(history) | {"print('elsewhere')"}
+    assert app.provenance["print('elsewhere')"] == "host"
+    assert app.provenance["print(sys.argv)"] == "python"
+
+    app.user_interface.populate_screen()
+    assert any(
+        args[2] == " [python]" for args in fake_stdscr.addstred if args[0] == 3
+    )
+
+    assert app.merged_trigrams.lookup(["elsewhere"]) == {"print('elsewhere')"}
+    app.search_string = "elsewhere"
+    app.search()
+    assert list(app.commands[View.MERGED]) == ["print('elsewhere')"]
+
+
+@pytest.mark.all
+def test_merged_view_includes_this_session(
+    monkeypatch, tmp_path, fake_stdscr, fake_standard, fake_readline
+):
+    (tmp_path / "histories").write_text("")
+    monkeypatch.setattr(application, "HISTORIES", tmp_path / "histories")
+    for shell in (Shell.IPYTHON, Shell.BPYTHON):
+        monkeypatch.setitem(application.SHELLS[shell], "hist", tmp_path / "nope")
+    fake_readline.add_history("import antigravity")
+    app = App(fake_stdscr)
+    app.view = View.ALL
+    app.toggle_view()
+    assert app.commands[View.MERGED][-1] == "import antigravity"
+    assert app.provenance["import antigravity"] == "python"
+    assert app.merged_trigrams.lookup(["antigravity"]) == {"import antigravity"}
+
+
+@pytest.mark.all
+def test_load_includes_this_session(fake_stdscr, fake_standard, fake_readline):
+    # run in this session, so not in the history file yet
+    fake_readline.add_history("import antigravity")
+    app = App(fake_stdscr)
+    assert app.commands[View.ALL][-1] == "import antigravity"
+    assert "import antigravity" in app.commands[View.SORTED]
+
+
+@pytest.mark.all
+def test_reopen_adds_commands_run_since(
+    fake_stdscr, fake_curses, fake_standard, fake_readline
+):
+    app = App(fake_stdscr)
+    app.search_string = "print"
+    app.search()
+    fake_readline.add_history("import antigravity")
+    fake_readline.add_history("print(sys.argv)")
+    app.reopen(fake_stdscr)
+    assert app.search_string == ""
+    history = read("tests/history/fake_python_history")
+    history += ["import antigravity", "print(sys.argv)"]
+    assert app.commands[View.ALL] == remove_duplicates(history)
+    assert sorted(app.commands[View.SORTED]) == sorted(app.commands[View.ALL])
+    assert app.trigrams.lookup(["antigravity"]) == {"import antigravity"}
+
+
+@pytest.mark.all
+def test_reopen_merged_view(
+    monkeypatch, tmp_path, fake_stdscr, fake_curses, fake_standard, fake_readline
+):
+    (tmp_path / "histories").write_text("")
+    monkeypatch.setattr(application, "HISTORIES", tmp_path / "histories")
+    for shell in (Shell.IPYTHON, Shell.BPYTHON):
+        monkeypatch.setitem(application.SHELLS[shell], "hist", tmp_path / "nope")
+    app = App(fake_stdscr)
+    app.view = View.ALL
+    app.toggle_view()
+    fake_readline.add_history("import antigravity")
+    app.reopen(fake_stdscr)
+    assert app.commands[View.MERGED][-1] == "import antigravity"
+    assert app.provenance["import antigravity"] == "python"
+    assert app.merged_trigrams.lookup(["antigravity"]) == {"import antigravity"}
+
+
+@pytest.mark.all
+def test_reopen_while_merging(
+    monkeypatch, tmp_path, fake_stdscr, fake_curses, fake_standard, fake_readline
+):
+    (tmp_path / "histories").write_text("")
+    monkeypatch.setattr(application, "HISTORIES", tmp_path / "histories")
+    for shell in (Shell.IPYTHON, Shell.BPYTHON):
+        monkeypatch.setitem(application.SHELLS[shell], "hist", tmp_path / "nope")
+    merge = App._merge  # pylint: disable=protected-access
+
+    def slow_merge(self):
+        time.sleep(0.1)
+        merge(self)
+
+    monkeypatch.setattr(App, "_merge", slow_merge)
+    app = App(fake_stdscr, background=True)
+    app.view = View.ALL
+    app.toggle_view()
+    fake_readline.add_history("import antigravity")
+    app.reopen(fake_stdscr)
+    app.wait_until_loaded()
+    assert app.commands[View.ALL][-1] == "import antigravity"
+    assert app.commands[View.MERGED][-1] == "import antigravity"
+
+
+@pytest.mark.all
+def test_reload_decays_frequent(
+    monkeypatch, tmp_path, fake_stdscr, fake_curses, fake_standard, fake_readline
+):
+    monkeypatch.setitem(
+        application.SHELLS[Shell.STANDARD], "index", tmp_path / "python_stamps"
+    )
+    fake_readline.history = ["import os"] * 5
+    monkeypatch.setattr(time, "time", lambda: 0.0)
+    App(fake_stdscr)
+    # a session later, two months on
+    fake_readline.add_history("import sys")
+    monkeypatch.setattr(time, "time", lambda: 60 * 24 * 60 * 60.0)
+    app = App(fake_stdscr)
+    assert app.commands[View.SORTED] == ["import sys", "import os"]
+
+
+@pytest.mark.all
+def test_reopen_ipython(fake_stdscr, fake_curses, fake_ipython):
+    app = App(fake_stdscr)
+    with fake_ipython.history_manager.db as db:
+        db.execute("INSERT INTO sessions (session, start) VALUES (2, '2020-02-01')")
+        db.executemany(
+            "INSERT INTO history VALUES (2, ?, ?, ?)",
+            [(1, "import this", "import this"), (2, "4 / 2", "4 / 2")],
+        )
+    app.reopen(fake_stdscr)
+    assert app.commands[View.SORTED][:2] == ["4 / 2", "import this"]
+    assert app.commands[View.ALL][-1] == "import this"
+    assert app.watermark == 2 * 128 * 1024 + 2
+    # updated from the new rows as if ranked anew
+    fresh = App(fake_stdscr)
+    assert app.commands[View.SORTED] == fresh.commands[View.SORTED]
+
+
+@pytest.mark.all
+def test_resume(monkeypatch, fake_stdscr, fake_curses, fake_standard):
+    monkeypatch.setattr(application, "SESSION", None)
+    app = application.resume(fake_stdscr)
+    app.loader.join()
+    application.suspend(app)
+    assert application.resume(fake_stdscr) is app
+    assert application.SESSION is None
+    app.wait_until_loaded()
+
+    app.load_error = PermissionError()
+    application.suspend(app)
+    fresh = application.resume(fake_stdscr)
+    assert fresh is not app
+    fresh.loader.join()
+
+
 @pytest.mark.parametrize("shell, fixture", params)
 def test_add_or_rm_fav(shell, fixture, fake_stdscr):
     app = App(fake_stdscr)
     path = application.SHELLS[shell]["fav"]
     for value in (True, False):
         app.add_or_rm_fav("egg")
-        favs = read(path)
+        favs = Favorites(path)
         assert favs.__contains__("egg") == value
+        assert app.commands[View.FAVORITES].__contains__("egg") == value
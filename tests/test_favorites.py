@@ -0,0 +1,53 @@
+# pylint: disable=redefined-outer-name
+
+import pytest
+
+from pyhstr.favorites import Favorites
+from pyhstr.utilities import read
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "favorites"
+    path.write_text("import this\nfrom pyhstr import hh\n1 + 1 == 2\n")
+    return path
+
+
+@pytest.mark.all
+def test_load(path):
+    favorites = Favorites(path)
+    assert list(favorites) == read(path)
+    assert len(favorites) == len(read(path))
+    assert read(path)[0] in favorites
+
+
+@pytest.mark.all
+def test_toggle_appends_to_journal(path):
+    before = path.read_text()
+    favorites = Favorites(path)
+    assert favorites.toggle("egg")
+    assert not favorites.toggle(read(path)[0])
+    assert path.read_text() == before
+    assert favorites.journal.read_text() == f"+egg\n-{read(path)[0]}\n"
+
+    reloaded = Favorites(path)
+    assert list(reloaded) == read(path)[1:] + ["egg"]
+    assert reloaded.journal_length == 2
+
+
+@pytest.mark.all
+def test_toggle_compacts_journal(path):
+    favorites = Favorites(path)
+    for _ in range(len(favorites) + 1):
+        favorites.toggle("egg")
+    assert not favorites.journal.exists()
+    assert favorites.journal_length == 0
+    assert read(path) == list(favorites)
+    assert list(Favorites(path)) == list(favorites)
+
+
+@pytest.mark.all
+def test_missing_file(tmp_path):
+    favorites = Favorites(tmp_path / "spam" / "favorites")
+    assert favorites.toggle("egg")
+    assert "egg" in Favorites(tmp_path / "spam" / "favorites")
@@ -0,0 +1,81 @@
+import pytest
+
+from pyhstr.fuzzy import Matcher, compile_pattern, get_mask, get_spans
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "search_string, command, expected",
+    [
+        ["prn", "print(1)", [(0, 2), (3, 4)]],
+        ["sa", "sys.argv", [(0, 1), (4, 5)]],
+        ["ab", "ba", []],
+        ["a.b", "a-.b", [(0, 1), (2, 4)]],
+    ],
+)
+def test_get_spans(search_string, command, expected):
+    assert get_spans(compile_pattern(search_string, False), command) == expected
+
+
+@pytest.mark.all
+def test_get_mask():
+    assert get_mask("abc") & get_mask("cA") == get_mask("ca")
+    assert get_mask("abc") & get_mask("cz") != get_mask("cz")
+
+
+@pytest.mark.all
+def test_search_ranks_by_match_quality():
+    candidates = ["xpxrxixnxt", "sprint", "print(1)", "nope"]
+    matcher = Matcher()
+    results = matcher.search(candidates, compile_pattern("print", False), "print")
+    assert results == ["print(1)", "sprint", "xpxrxixnxt"]
+    assert set(matcher.masks) == set(candidates)
+
+
+@pytest.mark.all
+def test_search_breaks_ties_by_rank():
+    candidates = ["tau = 1", "tau = 2", "tau = 3"]
+    results = Matcher().search(candidates, compile_pattern("tau", False), "tau", 2)
+    assert results == ["tau = 1", "tau = 2"]
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "search_string, command",
+    [["spam", "\u017fpam"], ["\u017fpam", "spam"], ["k", "\u212a = 273.15"]],
+)
+def test_search_folds_like_regexes(search_string, command):
+    regex = compile_pattern(search_string, False)
+    assert regex.search(command)
+    assert Matcher().search([command], regex, search_string) == [command]
+
+
+@pytest.mark.all
+def test_ranked_in_chunks():
+    candidates = [f"print({idx})" for idx in range(1000)] + ["pass"] * 10
+    ranked = Matcher().start(candidates, compile_pattern("pt", False), "pt", 5)
+    assert not ranked.advance(300)
+    assert not ranked.advance(300)
+    assert ranked.finish() == [f"print({idx})" for idx in range(5)]
+    assert ranked.done
+    assert len(ranked.matched) == 1000
+
+
+@pytest.mark.all
+def test_search_narrows_last_search():
+    candidates = ["print(1)", "sprint", "pass", "xpxrxixnxt", "nope"]
+    matcher = Matcher()
+    matcher.search(candidates, compile_pattern("pr", False), "pr")
+    ranked = matcher.start(candidates, compile_pattern("prin", False), "prin")
+    # only what "pr" matched is scored, with where it is in the view
+    assert matcher.previous.matched == [
+        (0, "print(1)"),
+        (1, "sprint"),
+        (3, "xpxrxixnxt"),
+    ]
+    fresh = Matcher().search(candidates, compile_pattern("prin", False), "prin")
+    assert ranked.finish() == fresh
+
+    # not an extension of "prin", so all of the view is scored again
+    ranked = matcher.start(candidates, compile_pattern("no", False), "no")
+    assert ranked.finish() == ["nope"]
@@ -0,0 +1,18 @@
+import subprocess
+import sys
+import pytest
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "module",
+    ["IPython", "bpython", "pyhstr.__main__", "pyhstr.application"],
+)
+def test_import_defers(module):
+    process = subprocess.run(
+        [sys.executable, "-c", "import sys, pyhstr; print(*sys.modules)"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    assert module not in process.stdout.split()
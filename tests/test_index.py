@@ -0,0 +1,136 @@
+# pylint: disable=redefined-outer-name
+
+import marshal
+import os
+import shutil
+import pytest
+
+from pyhstr import index
+from pyhstr.utilities import read, remove_duplicates, sort
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = tmp_path / "history"
+    shutil.copyfile("tests/history/fake_python_history", path)
+    return path
+
+
+def assert_ranked_like_read(ranking, history):
+    commands = read(history)
+    assert ranking.sorted() == sort(commands)
+    assert ranking.unique() == remove_duplicates(commands)
+    assert ranking.length == len(commands)
+
+
+@pytest.mark.all
+def test_load_builds_index(history, tmp_path):
+    assert_ranked_like_read(index.load(history, tmp_path / "index"), history)
+    assert (tmp_path / "index").exists()
+
+
+@pytest.mark.all
+def test_load_unchanged_skips_parsing(history, tmp_path, monkeypatch):
+    expected = index.load(history, tmp_path / "index").sorted()
+    monkeypatch.setattr(index, "_parse", None)
+    assert index.load(history, tmp_path / "index").sorted() == expected
+
+
+@pytest.mark.all
+def test_load_again_reuses_loaded(history, tmp_path, monkeypatch):
+    ranking = index.load(history, tmp_path / "index")
+    monkeypatch.setattr(index, "_read_index", None)
+    assert index.load(history, tmp_path / "index") is ranking
+
+
+@pytest.mark.all
+def test_load_appended(history, tmp_path, monkeypatch):
+    index.load(history, tmp_path / "index")
+    mtime_ns = history.stat().st_mtime_ns
+    with open(history, "a") as f:
+        print("import antigravity", file=f)
+        print("print(sys.argv)", file=f)
+    # appended in the same instant, so the ranking is still by count
+    os.utime(history, ns=(mtime_ns, mtime_ns))
+
+    parsed = []
+    parse = index._parse  # pylint: disable=protected-access
+
+    def spy(data):
+        parsed.append(data)
+        return parse(data)
+
+    monkeypatch.setattr(index, "_parse", spy)
+    assert_ranked_like_read(index.load(history, tmp_path / "index"), history)
+    assert parsed == [b"import antigravity\nprint(sys.argv)\n"]
+
+
+@pytest.mark.all
+def test_load_appended_later_ranks_first(history, tmp_path):
+    index.load(history, tmp_path / "index")
+    mtime = history.stat().st_mtime
+    with open(history, "a") as f:
+        print("import antigravity", file=f)
+    os.utime(history, (mtime, mtime + 30 * 24 * 60 * 60))
+
+    assert index.load(history, tmp_path / "index").sorted()[0] == "import antigravity"
+    # the scores are stored, so the update survives reloading the index
+    assert index.load(history, tmp_path / "index").sorted()[0] == "import antigravity"
+
+
+@pytest.mark.all
+def test_load_rewritten(history, tmp_path):
+    index.load(history, tmp_path / "index")
+    commands = read(history)
+    history.write_text("\n".join(["import this"] + commands[2:]) + "\n")
+    assert_ranked_like_read(index.load(history, tmp_path / "index"), history)
+
+
+@pytest.mark.all
+def test_load_other_history(history, tmp_path):
+    index.load(history, tmp_path / "index")
+    other = tmp_path / "other"
+    shutil.copyfile("tests/history/fake_bpython_history", other)
+    os.utime(other, ns=(history.stat().st_atime_ns, history.stat().st_mtime_ns))
+    assert_ranked_like_read(index.load(other, tmp_path / "index"), other)
+
+
+@pytest.mark.all
+def test_load_missing_history(tmp_path):
+    assert index.load(tmp_path / "spam", tmp_path / "index").sorted() == [""]
+    assert not (tmp_path / "index").exists()
+
+
+
+@pytest.mark.all
+def test_load_corrupt_index(history, tmp_path, monkeypatch):
+    index.load(history, tmp_path / "index")
+    data = (tmp_path / "index").read_bytes()
+    *_, path_length, tail_length = index.HEADER.unpack_from(data)
+    offset = index.HEADER.size + path_length + tail_length
+    commands, *rest, ranked, length = marshal.loads(data[offset:])
+    # a rank past the last command
+    ranked = ranked + [len(commands)]
+    payload = marshal.dumps((commands, *rest, ranked, length))
+    (tmp_path / "index").write_bytes(data[:offset] + payload)
+
+    monkeypatch.setattr(index, "LOADED", {})
+    assert_ranked_like_read(index.load(history, tmp_path / "index"), history)
+
+
+@pytest.mark.all
+def test_stamp(tmp_path):
+    path = tmp_path / "stamps"
+    assert index.stamp(path, {"import sys": 2, "x = 1": 1}, 10) == {
+        "import sys": 10,
+        "x = 1": 10,
+    }
+    # run again since, or for the first time
+    assert index.stamp(path, {"import sys": 2, "x = 1": 2, "del x": 1}, 20) == {
+        "import sys": 10,
+        "x = 1": 20,
+        "del x": 20,
+    }
+    path.write_bytes(b"not marshal")
+    assert index.stamp(path, {"import sys": 2}, 30) == {"import sys": 30}
+    assert index.stamp(None, {"import sys": 2}, 30) == {}
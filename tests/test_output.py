@@ -0,0 +1,110 @@
+# pylint: disable=redefined-outer-name
+# pylint: disable=unused-argument
+# pylint: disable=unused-import
+
+import sys
+from types import ModuleType
+import pytest
+
+from pyhstr import output, utilities
+from pyhstr.output import IPythonOutput, Output, ReadlineOutput, get_output
+from pyhstr.utilities import Shell
+
+from tests.fixtures import fake_fcntl, fake_termios
+
+
+class HookReadline:
+    def __init__(self):
+        self.hook = None
+        self.line_buffer = ""
+
+    def set_pre_input_hook(self, hook=None):
+        self.hook = hook
+
+    def insert_text(self, text):
+        self.line_buffer += text
+
+    def redisplay(self):
+        pass
+
+
+class FakeIPython:
+    def __init__(self):
+        self.next_input = None
+
+    def get_ipython(self):
+        return self
+
+    def set_next_input(self, text):
+        self.next_input = text
+
+
+@pytest.fixture
+def hook_readline(monkeypatch):
+    fake = HookReadline()
+    monkeypatch.setattr(output, "readline", fake)
+    return fake
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "shell, backend",
+    [
+        [Shell.STANDARD, ReadlineOutput],
+        [Shell.IPYTHON, IPythonOutput],
+        [Shell.BPYTHON, Output],
+    ],
+)
+def test_get_output(shell, backend):
+    assert isinstance(get_output(shell), backend)
+    assert get_output(shell) is get_output(shell)
+
+
+@pytest.mark.all
+def test_get_output_new_repl(monkeypatch):
+    # the REPL of Python 3.13+ reads input without GNU readline
+    monkeypatch.setattr(output, "get_readline", lambda: ModuleType("_pyrepl.readline"))
+    get_output.cache_clear()
+    try:
+        assert not isinstance(get_output(Shell.STANDARD), ReadlineOutput)
+    finally:
+        get_output.cache_clear()
+
+
+@pytest.mark.all
+@pytest.mark.parametrize("run", [True, False])
+def test_output(run, fake_fcntl, fake_termios):
+    Output().inject("spam", run=run)
+    expected = b"spam\n" if run else b"spam"
+    assert fake_fcntl.echoed == [(0, None, bytes([byte])) for byte in expected]
+
+
+@pytest.mark.all
+@pytest.mark.parametrize("run", [True, False])
+def test_readline_output(run, hook_readline, fake_fcntl, fake_termios):
+    ReadlineOutput().inject("spam", run=run)
+    assert hook_readline.line_buffer == ""
+    hook_readline.hook()
+    assert hook_readline.line_buffer == "spam"
+    assert hook_readline.hook is None
+    assert fake_fcntl.echoed == ([(0, None, b"\n")] if run else [])
+
+
+@pytest.mark.all
+def test_readline_output_without_tiocsti(hook_readline, monkeypatch):
+    def ioctl(*args):
+        raise OSError
+
+    monkeypatch.setattr(utilities, "ioctl", ioctl)
+    ReadlineOutput().inject("spam", run=True)
+    hook_readline.hook()
+    assert hook_readline.line_buffer == "spam"
+
+
+@pytest.mark.all
+def test_ipython_output(monkeypatch, fake_fcntl, fake_termios):
+    ipython = FakeIPython()
+    monkeypatch.setitem(sys.modules, "IPython", ipython)
+    IPythonOutput().inject("spam", run=True)
+    assert ipython.next_input == "spam"
+    assert fake_fcntl.echoed == [(0, None, b"\n")]
@@ -0,0 +1,81 @@
+import pytest
+
+from pyhstr.ranking import HALF_LIFE, MAX_HALF_LIVES, Ranking
+from pyhstr.utilities import remove_duplicates
+
+
+@pytest.mark.all
+def test_sorted():
+    history = [3, 2, 4, 6, 2, 4, 3, 3, 4, 5, 6, 3, 2, 4, 5, 5, 3]
+    assert Ranking(history).sorted() == [3, 4, 5, 2, 6]
+
+
+@pytest.mark.all
+def test_unique():
+    history = [3, 2, 4, 6, 2, 4, 3, 3, 4, 5, 6, 3, 2, 4, 5, 5, 3]
+    assert Ranking(history).unique() == remove_duplicates(history)
+
+
+@pytest.mark.all
+def test_update():
+    history = [3, 2, 4, 6, 2, 4, 3, 3, 4, 5, 6, 3, 2, 4, 5, 5, 3]
+    ranking = Ranking(history[:7])
+    ranking.update(iter(history[7:]))
+    assert ranking.sorted() == Ranking(history).sorted()
+    assert ranking.length == len(history)
+    assert ranking.positions[6] == 10
+
+
+@pytest.mark.all
+def test_extend():
+    history = [3, 2, 4, 6, 2, 4, 3, 3, 4, 5, 6, 3, 2, 4, 5, 5, 3]
+    ranked = Ranking(history)
+    ranking = Ranking()
+    ranking.extend(
+        (command, ranked.scores[command], ranked.counts[command], ranked.positions[command])
+        for command in ranked.sorted()
+    )
+    assert ranking.sorted() == ranked.sorted()
+    ranking.update([6, 6, 6])
+    ranked.update([6, 6, 6])
+    assert ranking.sorted() == ranked.sorted() == [6, 3, 4, 5, 2]
+
+
+@pytest.mark.all
+def test_recent_beats_frequent():
+    ranking = Ranking([1, 1, 1, 2, 2], timestamp=0)
+    ranking.update([3, 2], timestamp=2 * HALF_LIFE)
+    # 3 is worth 4 runs as of the epoch, 2 is worth 2 + 4
+    assert ranking.sorted() == [2, 3, 1]
+
+
+@pytest.mark.all
+def test_update_keeps_sorted_up_to_date():
+    history = list(range(200)) * 3
+    ranking = Ranking(history, timestamp=0)
+    ranking.sorted()
+    ranking.update([42, 7, 42], timestamp=HALF_LIFE)
+    ranked = ranking.ranked
+    ranking.ranked = None
+    assert ranked == ranking.sorted()
+    assert ranked[:2] == [42, 7]
+
+
+@pytest.mark.all
+def test_rebase():
+    ranking = Ranking([1, 1, 2], timestamp=0)
+    later = (MAX_HALF_LIVES + 1) * HALF_LIFE
+    ranking.update([3], timestamp=later)
+    assert ranking.epoch == later
+    assert ranking.scores[3] == 1
+    assert ranking.sorted() == [3, 1, 2]
+
+
+@pytest.mark.all
+def test_discard():
+    history = list(range(200)) * 2
+    ranking = Ranking(history)
+    ranking.sorted()
+    ranking.discard(7, 300)
+    assert 7 not in ranking.unique()
+    assert ranking.sorted() == [cmd for cmd in Ranking(history).sorted() if cmd != 7]
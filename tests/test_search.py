@@ -0,0 +1,145 @@
+# pylint: disable=too-few-public-methods
+
+import re
+
+import pytest
+
+from pyhstr.search import Query, Results, TooSlow, time_limit
+
+# backtracks for ages on the commands below
+CATASTROPHIC = re.compile(r"(a+)+$")
+SLOW_COMMAND = "a" * 40 + "!"
+
+
+@pytest.mark.all
+def test_compile_once_per_query():
+    query = Query()
+    regex = query.compile("spam", False, False)
+    assert query.compile("spam", False, False) is regex
+    assert query.compile("spam", False, True) is not regex
+    assert query.compile("spam", True, True) is not regex
+    assert query.compile("spa", True, True).pattern == "spa"
+
+
+@pytest.mark.all
+def test_compile_invalid_regex():
+    query = Query()
+    assert query.compile("print(", True, False) is None
+    assert query.compile("print(", False, False).pattern == r"print\("
+
+
+@pytest.mark.all
+def test_get_spans_memoized():
+    query = Query()
+    query.compile("a", False, False)
+    spans = query.get_spans("aaa + A")
+    assert spans == [(0, 3), (6, 7)]
+    assert query.get_spans("aaa + A") is spans
+
+    query.compile("a", False, True)
+    assert query.get_spans("aaa + A") == [(0, 3)]
+
+
+@pytest.mark.all
+def test_get_spans_invalid_regex():
+    query = Query()
+    query.compile("print(", True, False)
+    assert query.get_spans("print(sys.argv)") == []
+
+
+class Counting:
+    """
+    A match function that counts how many candidates it was asked about.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, candidate):
+        self.calls += 1
+        return candidate.startswith("a")
+
+
+@pytest.mark.all
+def test_results_scan_lazily():
+    match = Counting()
+    results = Results(["a1", "b1", "a2", "b2", "a3", "b3"], match)
+    assert results[0:2] == ["a1", "a2"]
+    assert match.calls == 3
+    assert results.found == 2 and not results.done
+    assert results[0] == "a1"
+    assert match.calls == 3
+    assert len(results) == 3
+    assert results.done
+    assert results[-1] == "a3"
+
+
+@pytest.mark.all
+def test_results_advance():
+    results = Results(["a1", "b1", "a2", "b2"], lambda cmd: cmd.startswith("a"))
+    assert not results.advance(chunk_size=3)
+    assert results.found == 2
+    assert results.advance(chunk_size=3)
+    assert list(results) == ["a1", "a2"]
+
+
+@pytest.mark.all
+def test_results_chained():
+    match = Counting()
+    narrowed = Results(["ab", "b", "a", "abc"], match)
+    results = Results(narrowed, lambda cmd: "b" in cmd)
+    assert results[0] == "ab"
+    assert match.calls == 1
+    assert list(results) == ["ab", "abc"]
+
+
+@pytest.mark.all
+def test_results_chained_advance():
+    match = Counting()
+    narrowed = Results(["b"] * 1000 + ["ab"], match)
+    results = Results(narrowed, lambda cmd: "b" in cmd)
+    assert not results.advance(chunk_size=10)
+    assert match.calls == 10
+    calls = match.calls
+    while not results.advance(chunk_size=10):
+        assert match.calls - calls <= 10
+        calls = match.calls
+    assert match.calls == 1001
+    assert list(results) == ["ab"]
+
+
+@pytest.mark.all
+def test_results_without():
+    match = Counting()
+    results = Results(["a1", "b1", "a2", "a3", "a1", "a4"], match)
+    assert results[0:2] == ["a1", "a2"]
+    remaining = results.without({"a1", "a4"})
+    assert remaining.found == 1 and not remaining.done
+    assert match.calls == 3
+    assert list(remaining) == ["a2", "a3"]
+    assert match.calls == 6
+
+
+@pytest.mark.all
+def test_time_limit():
+    with pytest.raises(TooSlow):
+        with time_limit(0.05):
+            CATASTROPHIC.search(SLOW_COMMAND)
+    with time_limit(1):
+        assert CATASTROPHIC.search("aaa")
+
+
+@pytest.mark.all
+def test_results_over_budget():
+    results = Results(["aa", SLOW_COMMAND, "aaa"], CATASTROPHIC.search, budget=0.05)
+    assert list(results) == ["aa"]
+    assert results.too_slow
+    assert results.done
+
+
+@pytest.mark.all
+def test_get_spans_over_budget():
+    query = Query()
+    query.compile("(a+)+$", True, False)
+    assert query.get_spans(SLOW_COMMAND) == []
+    assert query.get_spans("aa") == [(0, 2)]
@@ -0,0 +1,113 @@
+# pylint: disable=redefined-outer-name
+# pylint: disable=unused-import
+
+import sqlite3
+import sys
+from types import ModuleType
+
+import pytest
+
+from pyhstr.sources import (
+    ReadlineHistory,
+    Source,
+    get_readline,
+    get_sources,
+    iter_source,
+    merge,
+    read_config,
+)
+from pyhstr.utilities import read
+
+from tests.fixtures import fake_readline
+
+
+@pytest.fixture
+def histories(tmp_path):
+    first = tmp_path / "host1" / ".python_history"
+    first.parent.mkdir()
+    first.write_text("import os\nimport sys\nos.getcwd()\n")
+    second = tmp_path / "bpython_history"
+    second.write_text("print(1)\nimport sys\n")
+    return first, second
+
+
+@pytest.mark.all
+def test_read_config(tmp_path, histories):
+    config = tmp_path / "histories"
+    config.write_text(f"# synced\n{histories[0]}\n\nbp = {histories[1]}\n")
+    assert read_config(config) == [
+        Source("host1", histories[0]),
+        Source("bp", histories[1]),
+    ]
+    assert read_config(tmp_path / "nope") == []
+
+
+@pytest.mark.all
+def test_get_sources(tmp_path, histories):
+    config = tmp_path / "histories"
+    config.write_text(f"{histories[0]}\n{tmp_path / 'nope'}\n")
+    shells = [Source("python", histories[0]), Source("bpython", histories[1])]
+    assert get_sources(shells, config) == shells
+
+
+@pytest.mark.all
+def test_iter_database(tmp_path):
+    path = tmp_path / "history.sqlite"
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE history (session, line, source, source_raw)")
+    db.executemany(
+        "INSERT INTO history VALUES (?, ?, ?, ?)",
+        [(2, 1, "b", "b"), (1, 2, "a2", "a2"), (1, 1, "a1", "a1")],
+    )
+    db.commit()
+    db.close()
+    assert list(iter_source(path)) == [(1 / 3, "a1"), (2 / 3, "a2"), (1.0, "b")]
+
+
+@pytest.mark.all
+def test_merge(histories):
+    sources = [Source("python", histories[0]), Source("bpython", histories[1])]
+    merged = list(merge(sources))
+    assert merged == [
+        ("import os", "python"),
+        ("print(1)", "bpython"),
+        ("import sys", "python"),
+        ("os.getcwd()", "python"),
+    ]
+
+
+@pytest.mark.all
+def test_readline_history(fake_readline):
+    history = ReadlineHistory()
+    assert history.read() == read("tests/history/fake_python_history")
+    assert history.read() == []
+    fake_readline.add_history("import this ")
+    assert history.read() == ["import this"]
+    fake_readline.add_history("import antigravity")
+    history.skip()
+    assert history.read() == []
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "version, basic, can_use_pyrepl, expected",
+    [
+        [(3, 12), None, True, "readline"],
+        [(3, 13), None, True, "_pyrepl.readline"],
+        [(3, 13), "1", True, "readline"],
+        [(3, 13), None, False, "readline"],
+    ],
+)
+def test_get_readline(monkeypatch, version, basic, can_use_pyrepl, expected):
+    pyrepl = ModuleType("_pyrepl")
+    pyrepl.readline = ModuleType("_pyrepl.readline")
+    pyrepl.main = ModuleType("_pyrepl.main")
+    pyrepl.main.CAN_USE_PYREPL = can_use_pyrepl
+    for module in (pyrepl, pyrepl.readline, pyrepl.main):
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    monkeypatch.setattr(sys, "version_info", version)
+    if basic is None:
+        monkeypatch.delenv("PYTHON_BASIC_REPL", raising=False)
+    else:
+        monkeypatch.setenv("PYTHON_BASIC_REPL", basic)
+    assert get_readline() is sys.modules[expected]
@@ -0,0 +1,87 @@
+# pylint: disable=redefined-outer-name
+
+import json
+
+import pytest
+
+from pyhstr import tracing
+from pyhstr.tracing import Tracer, get_tracer, summarize
+
+
+@pytest.fixture
+def trace(tmp_path):
+    return tmp_path / "pyhstr" / "trace.jsonl"
+
+
+@pytest.mark.all
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("search"):
+        pass
+    tracer.flush()
+    assert not tracer.enabled
+    assert tracer.spans == []
+
+
+@pytest.mark.all
+def test_flush_appends_spans(trace):
+    tracer = Tracer(trace)
+    for phase in ("load", "search"):
+        with tracer.span(phase):
+            pass
+    tracer.flush()
+    tracer.flush()
+    with tracer.span("render"):
+        pass
+    tracer.flush()
+    spans = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert [span["phase"] for span in spans] == ["load", "search", "render"]
+    assert all(span["duration_ns"] >= 0 for span in spans)
+
+
+@pytest.mark.all
+def test_span_recorded_on_error(trace):
+    tracer = Tracer(trace)
+    with pytest.raises(ValueError):
+        with tracer.span("search"):
+            raise ValueError
+    assert "search" in tracer.last
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "env, config, expected",
+    [
+        [None, None, (False, False)],
+        ["1", None, (True, False)],
+        ["status", None, (True, True)],
+        ["off", "status", (False, False)],
+        [None, "Status\n", (True, True)],
+        [None, "off\n", (False, False)],
+    ],
+)
+def test_get_tracer(monkeypatch, tmp_path, env, config, expected):
+    if env is None:
+        monkeypatch.delenv(tracing.ENV, raising=False)
+    else:
+        monkeypatch.setenv(tracing.ENV, env)
+    monkeypatch.setattr(tracing, "CONFIG", tmp_path / "trace")
+    if config is not None:
+        (tmp_path / "trace").write_text(config)
+    tracer = get_tracer()
+    assert (tracer.enabled, tracer.overlay) == expected
+
+
+@pytest.mark.all
+def test_summarize(trace):
+    trace.parent.mkdir()
+    lines = [
+        json.dumps({"phase": "search", "start_ns": 0, "duration_ns": ms * 1_000_000})
+        for ms in range(1, 101)
+    ]
+    trace.write_text("\n".join(lines + ["not json"]) + "\n")
+    summary = summarize(trace)
+    assert summary["search"]["count"] == 100
+    assert summary["search"]["p50"] == 50
+    assert summary["search"]["p99"] == 99
+    assert summary["search"]["max"] == 100
@@ -0,0 +1,70 @@
+import re
+
+import pytest
+
+from pyhstr import trigram
+from pyhstr.trigram import TrigramIndex, get_literals, get_trigrams
+
+
+@pytest.mark.all
+def test_get_trigrams():
+    assert get_trigrams("Spam") == {"spa", "pam"}
+    assert get_trigrams("hh") == set()
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "search_string, regex_mode, expected",
+    [
+        ["print(", False, ["print("]],
+        [r"import \w+ as", True, ["import ", " as"]],
+        ["spam|eggs", True, []],
+        ["(spam)", True, []],
+        ["spam?", True, ["spa"]],
+        [r"print\(", True, ["print("]],
+        ["print(", True, []],
+    ],
+)
+def test_get_literals(search_string, regex_mode, expected):
+    assert get_literals(search_string, regex_mode) == expected
+
+
+@pytest.mark.all
+def test_lookup():
+    index = TrigramIndex(["import math", "from math import tau", "print(math.pi)"])
+    assert index.lookup(["IMPORT"]) == {"import math", "from math import tau"}
+    assert index.lookup(["math", "tau"]) == {"from math import tau"}
+    assert index.lookup(["spam"]) == set()
+    assert index.lookup(["pi"]) is None
+
+    index.discard("import math")
+    assert index.lookup(["import"]) == {"from math import tau"}
+
+
+@pytest.mark.all
+def test_lookup_too_common(monkeypatch):
+    monkeypatch.setattr(trigram, "FEW_COMMANDS", 1)
+    index = TrigramIndex(["import math", "import sys", "print(sys.argv)"])
+    assert index.lookup(["import"]) is None
+    assert index.lookup(["print"]) == {"print(sys.argv)"}
+
+
+@pytest.mark.all
+def test_add_again():
+    index = TrigramIndex(["import math", "import math"])
+    assert index.commands == ["import math"]
+    index.discard("import math")
+    index.add(["import math"])
+    assert index.lookup(["import"]) == {"import math"}
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "command, literal",
+    [['print("ΟΔΟΣ")', "οδοσ"], ['"ſys"', "sys"]],
+)
+def test_lookup_folds_like_regexes(command, literal):
+    assert re.search(literal, command, re.IGNORECASE)
+    index = TrigramIndex([command, "import math"])
+    found = index.lookup([literal])
+    assert found is None or command in found
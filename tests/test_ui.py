@@ -6,14 +6,18 @@
 
 import pytest
 
+from pyhstr import application
 from pyhstr.application import App
+from pyhstr.tracing import Tracer
 from pyhstr.user_interface import (
     COLORS,
+    REGEX_TOO_SLOW,
     Direction,
     Page,
     UserInterface,
 )
 from tests.fixtures import (
+    FakeCurses,
     fake_curses,
     fake_standard,
     fake_stdscr,
@@ -84,6 +88,16 @@ def test_page_turn(
     assert page.value == expected
 
 
+@pytest.mark.all
+@pytest.mark.parametrize("direction", [Direction.NEXT, Direction.PREVIOUS])
+def test_page_turn_without_matches(direction, fake_curses, fake_stdscr, fake_standard):
+    app = App(fake_stdscr)
+    app.search_string = "no such command"
+    app.search()
+    app.user_interface.page.turn(direction)
+    assert app.user_interface.page.value == 1
+
+
 @pytest.mark.all
 def test_total_pages(fake_curses, fake_stdscr, fake_standard):
     user_interface = UserInterface(App(fake_stdscr))
@@ -117,6 +131,67 @@ def test_page_get_selected(fake_curses, fake_stdscr, fake_standard):
     assert page.get_selected() == '__import__("math").pi'
 
 
+@pytest.mark.all
+def test_layout_refreshed_on_resize(monkeypatch, fake_curses, fake_stdscr, fake_standard):
+    app = App(fake_stdscr)
+    app.user_interface.page.move_selected(Direction.NEXT)
+    app.user_interface.page.turn(Direction.NEXT)
+    selected = app.user_interface.page.get_selected()
+
+    monkeypatch.setattr(FakeCurses, "LINES", 5)
+    assert app.user_interface.layout.page_size == 7
+    app.user_interface.resize()
+    assert app.user_interface.layout.page_size == 2
+    assert app.user_interface.page.get_selected() == selected
+    assert app.user_interface.page.value == 5
+
+
+def get_drawn_status(fake_stdscr):
+    # the status line is drawn at y=2, after the prompt and the label
+    return [text for y_coord, _, text, _ in fake_stdscr.addstred if y_coord == 2][-1]
+
+
+@pytest.mark.all
+def test_status_shows_loading(monkeypatch, fake_curses, fake_stdscr, fake_standard):
+    app = App(fake_stdscr)
+    app.user_interface.populate_screen()
+    assert "loading" not in get_drawn_status(fake_stdscr)
+    monkeypatch.setattr(app, "is_loading", lambda: True)
+    app.user_interface.populate_screen()
+    status = get_drawn_status(fake_stdscr)
+    assert status.rstrip().endswith("- loading... -")
+    assert len(status) == FakeCurses.COLS - 1
+
+
+@pytest.mark.all
+def test_status_shows_timings(fake_curses, fake_stdscr, fake_standard, tmp_path):
+    app = App(fake_stdscr)
+    app.tracer = Tracer(tmp_path / "trace.jsonl", overlay=True)
+    app.search_string = "print"
+    app.search()
+    status = get_drawn_status(fake_stdscr)
+    assert "(C-/)" not in status
+    assert status.startswith("- search ")
+    assert " ms - view:sorted" in status
+    assert len(status) == FakeCurses.COLS - 1
+
+
+@pytest.mark.all
+def test_populate_screen_shows_regex_too_slow(
+    monkeypatch, fake_curses, fake_stdscr, fake_standard
+):
+    monkeypatch.setattr(application, "MATCH_BUDGET", 0.05)
+    app = App(fake_stdscr)
+    app.to_restore[app.view].append("a" * 40 + "!")
+    app.regex_mode = True
+    app.search_string = "(a+)+$"
+    app.search()
+    len(app.commands[app.view])
+    assert app.commands[app.view].too_slow
+    app.user_interface.populate_screen()
+    assert (1, 1, REGEX_TOO_SLOW, COLORS["highlighted-red"]) in fake_stdscr.addstred
+
+
 @pytest.mark.all
 def test_prompt_for_deletion(fake_curses, fake_stdscr, fake_standard):
     user_interface = UserInterface(App(fake_stdscr))
@@ -127,6 +202,15 @@ def test_prompt_for_deletion(fake_curses, fake_stdscr, fake_standard):
      ) in fake_stdscr.addstred
 
 
+@pytest.mark.all
+def test_prompt_for_deletion_of_marked(fake_curses, fake_stdscr, fake_standard):
+    user_interface = UserInterface(App(fake_stdscr))
+    user_interface.prompt_for_deletion("4 / 2", "2 ** 10")
+    assert (
+        1, 1, "Do you want to delete all occurences of 2 marked commands? y/n", 0
+     ) in fake_stdscr.addstred
+
+
 @pytest.mark.all
 def test_show_regex_error(fake_curses, fake_stdscr, fake_standard):
     user_interface = UserInterface(App(fake_stdscr))
@@ -142,3 +226,64 @@ def test_init_color_pairs(fake_curses, fake_stdscr):
     user_interface.init_color_pairs()
     for v in COLORS.values():
         assert v != 0
+
+
+@pytest.mark.all
+def test_populate_screen_draws_changed_rows(fake_curses, fake_stdscr, fake_standard):
+    user_interface = UserInterface(App(fake_stdscr))
+    user_interface.init_color_pairs()
+    user_interface.populate_screen()
+    assert sorted(args[0] for args in fake_stdscr.addstred) == list(range(10))
+
+    fake_stdscr.addstred.clear()
+    user_interface.page.move_selected(Direction.NEXT)
+    user_interface.populate_screen()
+    assert sorted(args[0] for args in fake_stdscr.addstred) == [3, 4]
+
+    fake_stdscr.addstred.clear()
+    user_interface.populate_screen()
+    assert not fake_stdscr.addstred
+
+
+@pytest.mark.all
+def test_populate_screen_blanks_leftover_rows(fake_curses, fake_stdscr, fake_standard):
+    app = App(fake_stdscr)
+    app.user_interface.populate_screen()
+    app.search_string = "tau"
+    app.search()
+    assert len(app.commands[app.view]) == 2
+    blank = (1, "".ljust(FakeCurses.COLS - 1), COLORS["normal"])
+    for y_coord in range(5, 10):
+        assert (y_coord, *blank) in fake_stdscr.addstred
+
+
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "search_string, regex_mode, command, expected",
+    [
+        ["sys", False, "print(sys.argv)", [(6, 9)]],
+        ["a", False, "aaa + a", [(0, 3), (6, 7)]],
+        ["[0-9]", True, "2 ** 10", [(0, 1), (5, 7)]],
+        ["x*", True, "1 + 1", []],
+        ["print(", True, "print(sys.argv)", []],
+    ],
+)
+def test_get_matched_chars(
+    search_string, regex_mode, command, expected, fake_curses, fake_stdscr
+):
+    app = App(fake_stdscr)
+    app.search_string = search_string
+    app.regex_mode = regex_mode
+    assert app.user_interface.get_matched_chars(command) == expected
+
+
+@pytest.mark.all
+def test_populate_screen_highlights_spans(fake_curses, fake_stdscr, fake_standard):
+    app = App(fake_stdscr)
+    app.user_interface.init_color_pairs()
+    app.search_string = "sys"
+    app.search()
+    highlighted = [args for args in fake_stdscr.addstred if args[3] == COLORS["bold-red"]]
+    assert highlighted
+    assert all(args[2] == "sys" for args in highlighted)
+    assert not fake_stdscr.addched
@@ -2,16 +2,20 @@
 # pylint: disable=unused-argument
 # pylint: disable=unused-import
 
-import os
+import sys
 import pytest
 
 from pyhstr import utilities
 from pyhstr.utilities import (
     Shell,
+    IPYTHON_SORTED,
+    IPYTHON_UNIQUE,
     detect_shell,
     echo,
     get_bpython_history_path,
-    get_ipython_history,
+    index_ipython_history,
+    iter_ipython_history,
+    register_decay,
     read,
     remove_duplicates,
     sort,
@@ -24,6 +28,7 @@ from tests.fixtures import (
     fake_ipython,
     fake_standard,
     fake_termios,
+    make_ipython_db,
     random_history,
     params,
 )
@@ -53,15 +58,40 @@ def test_get_bpython_history_path():
 
 @pytest.mark.bpython
 def test_get_bpython_history_path_none(monkeypatch):
-    monkeypatch.setattr(utilities, "Struct", None)
+    monkeypatch.setitem(sys.modules, "bpython.config", None)
     assert get_bpython_history_path() is None
 
 
-@pytest.mark.ipython
-@pytest.mark.skipif(os.environ["PYTHON_SHELL"] != "ipython", reason="ipython only")
-def test_get_ipython_history(fake_ipython):
-    history = get_ipython_history()
-    assert isinstance(history, list)
+@pytest.mark.all
+@pytest.mark.parametrize(
+    "query, rank",
+    [[IPYTHON_SORTED, sort], [IPYTHON_UNIQUE, remove_duplicates]],
+)
+def test_iter_ipython_history(query, rank):
+    history = list("32462433456324553")
+    # the same history, split across sessions
+    db = make_ipython_db([history[:5], history[5:6], history[6:]])
+    index_ipython_history(db)
+    register_decay(db)
+    expected = rank(history)
+    pages = [
+        [row[0] for row in page]
+        for page in iter_ipython_history(db, query, page_size=2)
+    ]
+    assert pages == [expected[:2], expected[2:4], expected[4:]]
+
+
+@pytest.mark.all
+def test_iter_ipython_history_decays():
+    db = make_ipython_db(
+        [list("1112233"), list("3"), list("2")],
+        # the last two sessions are one and two half-lives later
+        ["2020-01-01 00:00:00", "2020-01-15 00:00:00", "2020-01-29 00:00:00"],
+    )
+    register_decay(db)
+    # 2 scores 2/4 + 1, 3 scores 2/4 + 1/2, 1 scores 3/4
+    (page,) = iter_ipython_history(db, IPYTHON_SORTED)
+    assert [row[0] for row in page] == ["2", "3", "1"]
 
 
 @pytest.mark.all
@@ -83,6 +113,28 @@ def test_write(tmp_path, random_history):
     assert (path).exists()
 
 
+@pytest.mark.all
+def test_write_keeps_mode(tmp_path):
+    path = tmp_path / "spam"
+    path.write_text("eggs\n")
+    path.chmod(0o600)
+    write(path, ["ham"])
+    assert read(path) == ["ham"]
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+@pytest.mark.all
+def test_write_follows_symlink(tmp_path):
+    target = tmp_path / "spam"
+    target.write_text("eggs\n")
+    link = tmp_path / "link"
+    link.symlink_to(target)
+    write(link, ["ham"])
+    assert link.is_symlink()
+    assert read(target) == ["ham"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["link", "spam"]
+
+
 @pytest.mark.all
 def test_read_none():
     with pytest.raises(AssertionError):